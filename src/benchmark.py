@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from src.simulation.solar_system import SolarSystem
+from src.simulation.kepler import PLANET_ECCENTRICITY, PLANET_PERIAPSIS
+
+MODES = ('circular', 'kepler', 'gravity')
+VIEW_MODES = ('Oblic View', 'Top View', 'Lateral View', 'Free Camera', 'Follow Planet')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m src.benchmark',
+        description='Time the simulation and offscreen rendering at several body counts '
+                    'and write the results as JSON.')
+    parser.add_argument('--bodies', type=int, nargs='+', default=[10, 1000, 100000],
+                        help='body counts; the default system is padded with asteroids '
+                             'up to each count (it never has fewer than its own bodies)')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES,
+                        help='simulation modes to time')
+    parser.add_argument('--gravity-max', type=int, default=1000,
+                        help='skip the N-body mode above this many bodies')
+    parser.add_argument('--steps', type=int, default=200, help='timed steps per case')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed steps per case')
+    parser.add_argument('--step', type=float, default=0.016, help='fixed step size')
+    parser.add_argument('--seed', type=int, default=1, help='seed for every system built')
+    parser.add_argument('--render', action='store_true',
+                        help='also time paintGL offscreen for every camera mode '
+                             '(needs PyQt6, PyOpenGL and EGL; software GL works)')
+    parser.add_argument('--frames', type=int, default=60, help='timed frames per render case')
+    parser.add_argument('--size', type=int, nargs=2, default=[1280, 720], metavar=('W', 'H'),
+                        help='offscreen framebuffer size')
+    parser.add_argument('--output', default=os.path.join('results', 'benchmark.json'),
+                        help='JSON results file')
+    parser.add_argument('--compare', default=None, metavar='JSON',
+                        help='print the change against an earlier results file')
+    return parser.parse_args(argv)
+
+
+def scaled_system(count, seed, mode='circular'):
+    # The default system plus a belt of asteroids up to count bodies
+    system = SolarSystem(seed=seed)
+    extra = count - len(system.state)
+    if extra > 0:
+        rng = system.rng
+        system.add_bodies(
+            [f"Asteroid {i}" for i in range(extra)],
+            radius=0.05,
+            distance=rng.uniform(6.5, 7.5, extra),
+            orbital_period=rng.uniform(3.0, 6.0, extra),
+            orbital_inclination=rng.uniform(-0.1, 0.1, extra),
+        )
+    if mode == 'gravity':
+        system.enable_gravity('leapfrog')
+    elif mode == 'kepler':
+        system.enable_ephemeris(eccentricities=PLANET_ECCENTRICITY, periapsis=PLANET_PERIAPSIS)
+    return system
+
+
+def timings(samples):
+    # Summary of per-call times in seconds, reported in milliseconds
+    ms = 1000.0 * np.asarray(samples)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'mean_ms': float(ms.mean()), 'p50_ms': float(p50), 'p95_ms': float(p95),
+            'p99_ms': float(p99), 'max_ms': float(ms.max())}
+
+
+def time_calls(function, count, warmup=0):
+    for _ in range(warmup):
+        function()
+    samples = np.empty(count)
+    for i in range(count):
+        start = time.perf_counter()
+        function()
+        samples[i] = time.perf_counter() - start
+    return samples
+
+
+def peak_memory(function):
+    # Peak traced allocation in MB while function runs
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_simulation(count, mode, args):
+    system = scaled_system(count, args.seed, mode)
+    n = len(system.state)
+    update = lambda: system.update(args.step)
+    steps = time_calls(update, args.steps, args.warmup)
+    result = {'bodies': n, 'mode': mode, 'steps': args.steps,
+              'update': timings(steps),
+              'steps_per_s': float(len(steps) / steps.sum()),
+              'body_steps_per_s': float(n * len(steps) / steps.sum())}
+    # World positions and velocities, as read by the renderer and recorders
+    result['world_positions'] = timings(time_calls(system.state.world_positions, args.steps, 2))
+    result['velocities'] = timings(time_calls(system.get_velocities, args.steps, 2))
+
+    # Memory is traced in a separate run, since tracing slows every call
+    def footprint():
+        traced = scaled_system(count, args.seed, mode)
+        for _ in range(min(args.steps, 20)):
+            traced.update(args.step)
+    result['peak_memory_mb'] = peak_memory(footprint)
+    return result
+
+
+def egl_context(width, height):
+    # Headless OpenGL through EGL, with no display or window system: Mesa's
+    # surfaceless platform gives llvmpipe (or a GPU through its render
+    # node), and all drawing goes to a framebuffer object. Qt's offscreen
+    # platform cannot create GL contexts, so Qt only hosts the widgets.
+    import ctypes
+    from OpenGL import EGL
+    from OpenGL.GL import (glGenFramebuffers, glBindFramebuffer, glGenRenderbuffers,
+                           glBindRenderbuffer, glRenderbufferStorage, glFramebufferRenderbuffer,
+                           glCheckFramebufferStatus, GL_FRAMEBUFFER, GL_RENDERBUFFER, GL_RGBA8,
+                           GL_DEPTH24_STENCIL8, GL_COLOR_ATTACHMENT0,
+                           GL_DEPTH_STENCIL_ATTACHMENT, GL_FRAMEBUFFER_COMPLETE)
+
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if display == EGL.EGL_NO_DISPLAY or not EGL.eglInitialize(display, ctypes.pointer(major),
+                                                              ctypes.pointer(minor)):
+        raise RuntimeError("Could not open an EGL display (is Mesa's libEGL installed?)")
+    config_attribs = (EGL.EGLint * 7)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                                      EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                                      EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_NONE)
+    config, found = EGL.EGLConfig(), EGL.EGLint()
+    if not EGL.eglChooseConfig(display, config_attribs, ctypes.pointer(config), 1,
+                               ctypes.pointer(found)) or found.value == 0:
+        raise RuntimeError("No EGL config supports desktop OpenGL")
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    # 3.3 compatibility: the instanced shaders plus the fixed-function calls
+    context_attribs = (EGL.EGLint * 7)(EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+                                       EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+                                       EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+                                       EGL.EGL_CONTEXT_OPENGL_COMPATIBILITY_PROFILE_BIT,
+                                       EGL.EGL_NONE)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, context_attribs)
+    if context == EGL.EGL_NO_CONTEXT or not EGL.eglMakeCurrent(
+            display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context):
+        raise RuntimeError("Could not create a surfaceless OpenGL 3.3 context through EGL")
+
+    fbo = glGenFramebuffers(1)
+    glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+    for storage, attachment in ((GL_RGBA8, GL_COLOR_ATTACHMENT0),
+                                (GL_DEPTH24_STENCIL8, GL_DEPTH_STENCIL_ATTACHMENT)):
+        buffer = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, buffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, storage, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, attachment, GL_RENDERBUFFER, buffer)
+    if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+        raise RuntimeError("Could not create the offscreen framebuffer")
+
+    def release():
+        EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroyContext(display, context)
+        EGL.eglTerminate(display)
+    return release
+
+
+def bench_render(counts, args):
+    # paintGL into a framebuffer object of a surfaceless EGL context, so no
+    # window or display is needed; with Mesa, LIBGL_ALWAYS_SOFTWARE=1
+    # forces llvmpipe
+    if 'OpenGL' in sys.modules and os.environ.get('PYOPENGL_PLATFORM') != 'egl':
+        raise RuntimeError("PyOpenGL was already loaded for another platform; "
+                           "run with PYOPENGL_PLATFORM=egl")
+    os.environ['PYOPENGL_PLATFORM'] = 'egl'
+    os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+    from OpenGL.GL import glFinish, glGetString, glGetError, GL_RENDERER, GL_VERSION, GL_NO_ERROR
+    from src.ui.main_window import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    width, height = args.size
+    release = egl_context(width, height)
+    info = {'gl_renderer': glGetString(GL_RENDERER).decode(),
+            'gl_version': glGetString(GL_VERSION).decode()}
+
+    results = []
+    for count in counts:
+        window = MainWindow(seed=args.seed)
+        widget = window.gl_widget
+        # Frames are driven here, not by the widget's timer
+        widget.timer.stop()
+        system = widget.solar_system
+        extra = count - len(system.state)
+        if extra > 0:
+            rng = system.rng
+            system.add_bodies([f"Asteroid {i}" for i in range(extra)], radius=0.05,
+                              distance=rng.uniform(6.5, 7.5, extra),
+                              orbital_period=rng.uniform(3.0, 6.0, extra),
+                              orbital_inclination=rng.uniform(-0.1, 0.1, extra))
+            widget.stepper.reset()
+        widget.initializeGL()
+        widget.resizeGL(width, height)
+        window.select_body("Earth")
+        renderer = 'instanced' if widget.sphere_renderer is not None else 'fixed'
+
+        def frame():
+            widget.stepper.advance(1.0 / 60.0)
+            widget.paintGL()
+            glFinish()
+            error = glGetError()
+            if error != GL_NO_ERROR:
+                raise RuntimeError(f"OpenGL error 0x{error:x} while drawing {view_mode}")
+
+        for view_mode in VIEW_MODES:
+            window.view_combo.setCurrentText(view_mode)
+            widget.view_mode = view_mode
+            widget.profiler.clear()
+            samples = time_calls(frame, args.frames, warmup=3)
+            averages = widget.profiler.averages()
+            last = widget.profiler.frames[-1]
+            results.append({'bodies': len(system.state), 'view_mode': view_mode,
+                            'renderer': renderer, 'frames': args.frames,
+                            'frame': timings(samples),
+                            'fps': float(len(samples) / samples.sum()),
+                            'stages_ms': averages,
+                            'draw_calls': last['draw_calls'], 'vertices': last['vertices'],
+                            'culled': {kind: widget.cull_stats.culled(kind)
+                                       for kind in widget.cull_stats.KINDS},
+                            'peak_rss_mb': peak_rss_mb()})
+            print_render(results[-1])
+        widget.cleanup_gl()
+        window.deleteLater()
+        app.processEvents()
+    release()
+    return info, results
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_simulation(r):
+    u = r['update']
+    print(f"{r['mode']:<9} {r['bodies']:>8} bodies  update p50 {u['p50_ms']:8.3f} ms  "
+          f"p95 {u['p95_ms']:8.3f} ms  {r['body_steps_per_s']:12.0f} body-steps/s  "
+          f"peak {r['peak_memory_mb']:7.2f} MB")
+
+
+def print_render(r):
+    f = r['frame']
+    print(f"{r['view_mode']:<13} {r['bodies']:>8} bodies  frame p50 {f['p50_ms']:8.2f} ms  "
+          f"p95 {f['p95_ms']:8.2f} ms  {r['fps']:7.1f} fps  {r['draw_calls']} draws")
+
+
+def compare(old, new):
+    # Ratio new / old of the median times for every case in both files
+    def cases(results):
+        table = {}
+        for r in results.get('simulation', []):
+            table[('update', r['mode'], r['bodies'])] = r['update']['p50_ms']
+        for r in results.get('render', []):
+            table[('frame', r['view_mode'], r['bodies'])] = r['frame']['p50_ms']
+        return table
+    before, after = cases(old), cases(new)
+    for key in sorted(set(before) & set(after), key=str):
+        ratio = after[key] / before[key] if before[key] > 0 else float('inf')
+        print(f"{key[0]:<6} {key[1]:<13} {key[2]:>8}  {before[key]:9.3f} -> {after[key]:9.3f} ms  "
+              f"x{ratio:.2f}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {'commit': git_commit(), 'python': platform.python_version(),
+               'numpy': np.__version__, 'platform': platform.platform(),
+               'machine': platform.machine(), 'seed': args.seed, 'step': args.step,
+               'simulation': [], 'render': []}
+    for count in args.bodies:
+        for mode in args.modes:
+            if mode == 'gravity' and count > args.gravity_max:
+                continue
+            results['simulation'].append(bench_simulation(count, mode, args))
+            print_simulation(results['simulation'][-1])
+    if args.render:
+        try:
+            results['gl'], results['render'] = bench_render(args.bodies, args)
+        except (ImportError, RuntimeError) as e:
+            # Asked for, so a missing render run must not look like a pass
+            print("Rendering benchmark failed:", e, file=sys.stderr)
+            results['render_error'] = str(e)
+    results['peak_rss_mb'] = peak_rss_mb()
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return 1 if 'render_error' in results else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
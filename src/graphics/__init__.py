@@ -0,0 +1,3 @@
+"""
+Rendering components for the solar system simulation
+""" 
\ No newline at end of file
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def frustum_planes(modelview, projection):
+    # The six clip planes (left, right, bottom, top, near, far) in world
+    # space as rows (a, b, c, d) with unit normals pointing inwards, from
+    # the matrices as returned by glGetFloatv (column-major)
+    view = np.asarray(modelview, dtype=np.float64).reshape(4, 4).T
+    proj = np.asarray(projection, dtype=np.float64).reshape(4, 4).T
+    m = proj @ view
+    planes = np.array([m[3] + m[0], m[3] - m[0],
+                       m[3] + m[1], m[3] - m[1],
+                       m[3] + m[2], m[3] - m[2]])
+    planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+    return planes
+
+
+def spheres_visible(planes, centres, radius):
+    # True for every bounding sphere that is at least partly inside the
+    # frustum. One (N, 3) x (3, 6) product gives all signed distances.
+    centres = np.asarray(centres)
+    if len(centres) == 0:
+        return np.zeros(0, dtype=bool)
+    distance = centres @ planes[:, :3].T
+    distance += planes[:, 3]
+    distance += np.asarray(radius, dtype=np.float64).reshape(-1, 1)
+    return np.all(distance >= 0, axis=1)
+
+
+class CullStats:
+    # Visible and total counts per kind of object for the last frame
+    KINDS = ('bodies', 'rings', 'orbits')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.visible = dict.fromkeys(self.KINDS, 0)
+        self.total = dict.fromkeys(self.KINDS, 0)
+
+    def record(self, kind, mask):
+        self.visible[kind] = int(np.count_nonzero(mask))
+        self.total[kind] = len(mask)
+
+    def culled(self, kind):
+        return self.total[kind] - self.visible[kind]
+
+    def summary(self):
+        return ", ".join(f"{kind} {self.culled(kind)}/{self.total[kind]}" for kind in self.KINDS)
@@ -0,0 +1,61 @@
+import math
+import numpy as np
+
+
+class LODSettings:
+    def __init__(self):
+        # (minimum projected radius in pixels, segments), most detailed first.
+        # Spheres smaller than the last threshold are drawn as points.
+        self.sphere_levels = [(120.0, 48), (40.0, 32), (12.0, 16), (3.0, 8)]
+        # Orbits and rings use the projected radius of the whole loop
+        self.orbit_levels = [(300.0, 128), (80.0, 64), (20.0, 32), (0.0, 16)]
+        self.ring_levels = [(100.0, 64), (30.0, 32), (0.0, 16)]
+        # Multiplies every projected size; above 1 keeps more detail
+        self.bias = 1.0
+
+    @property
+    def point_level(self):
+        return len(self.sphere_levels)
+
+    def sphere_segments(self, level):
+        return self.sphere_levels[min(level, len(self.sphere_levels) - 1)][1]
+
+    def sphere_level(self, pixels):
+        return select_levels(pixels * self.bias, self.sphere_levels)
+
+    def ring_segments(self, pixels):
+        return _segments(pixels * self.bias, self.ring_levels)
+
+
+def pixel_scale(fov_y, viewport_height):
+    # Pixels per world unit at distance 1 for a perspective projection
+    return 0.5 * viewport_height / math.tan(math.radians(fov_y) / 2)
+
+
+def camera_eye(modelview):
+    # Eye position in world space from a modelview matrix as returned by
+    # glGetFloatv (column-major, so the NumPy array is the transpose)
+    m = np.asarray(modelview, dtype=np.float64).reshape(4, 4)
+    return -m[:3, :3] @ m[3, :3]
+
+
+def projected_radius(positions, radius, eye, scale):
+    # Approximate on-screen radius in pixels of spheres at the positions
+    d = np.asarray(positions) - eye
+    dist = np.sqrt(np.einsum('ij,ij->i', d, d))
+    np.maximum(dist, 1e-6, out=dist)
+    return radius * scale / dist
+
+
+def select_levels(pixels, levels):
+    # Index of the first level whose threshold the size reaches; len(levels)
+    # when it is below every threshold
+    thresholds = np.array([t for t, _ in levels])[::-1]
+    return len(levels) - np.searchsorted(thresholds, pixels, side='right')
+
+
+def _segments(pixels, levels):
+    for threshold, segments in levels:
+        if pixels >= threshold:
+            return segments
+    return levels[-1][1]
@@ -0,0 +1,74 @@
+from OpenGL.GL import *
+import numpy as np
+
+
+def build_sphere(slices=32, stacks=32):
+    # Unit sphere as an indexed triangle list. For a unit sphere the vertex
+    # position is also its normal, so one array serves both.
+    lat = np.pi * (-0.5 + np.arange(stacks + 1) / stacks)
+    lng = 2 * np.pi * np.arange(slices + 1) / slices
+    zr = np.cos(lat)[:, None]
+    vertices = np.empty((stacks + 1, slices + 1, 3), dtype=np.float32)
+    vertices[..., 0] = zr * np.cos(lng)[None, :]
+    vertices[..., 1] = zr * np.sin(lng)[None, :]
+    vertices[..., 2] = np.sin(lat)[:, None]
+
+    # Two triangles per quad of the latitude/longitude grid
+    row = np.arange(stacks)[:, None] * (slices + 1)
+    col = np.arange(slices)[None, :]
+    a = (row + col).ravel()
+    b = a + slices + 1
+    indices = np.stack([a, a + 1, b, b, a + 1, b + 1], axis=1).astype(np.uint32)
+    return vertices.reshape(-1, 3), indices.ravel()
+
+
+class SphereMesh:
+    def __init__(self, slices, stacks):
+        self.vertices, self.indices = build_sphere(slices, stacks)
+        self.index_count = len(self.indices)
+        self.vertex_count = len(self.vertices)
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
+        self.ibo = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        # Fixed-function draw of the unit sphere; scale with the modelview
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glNormalPointer(GL_FLOAT, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def release(self):
+        glDeleteBuffers(2, [self.vbo, self.ibo])
+
+
+class MeshCache:
+    # One uploaded sphere per (slices, stacks), built on first use. Needs a
+    # current GL context, so create it from initializeGL.
+    def __init__(self):
+        self.meshes = {}
+
+    def sphere(self, slices=32, stacks=32):
+        key = (slices, stacks)
+        mesh = self.meshes.get(key)
+        if mesh is None:
+            mesh = SphereMesh(slices, stacks)
+            self.meshes[key] = mesh
+        return mesh
+
+    def release(self):
+        for mesh in self.meshes.values():
+            mesh.release()
+        self.meshes.clear()
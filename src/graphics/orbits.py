@@ -0,0 +1,100 @@
+from OpenGL.GL import *
+import numpy as np
+
+from .lod import select_levels
+
+
+class OrbitCache:
+    # Every orbit loop, at every LOD resolution, in one static vertex buffer.
+    # Geometry is only rebuilt when an orbit's distance, inclination or
+    # z offset, or the LOD segment counts, change; drawing picks a
+    # resolution per orbit and issues a single glMultiDrawArrays call.
+    def __init__(self, segment_levels=(128, 64, 32, 16)):
+        self.segment_levels = np.array(segment_levels, dtype=np.int32)
+        self.vbo = glGenBuffers(1)
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.first = np.zeros((0, len(segment_levels)), dtype=np.int32)
+        self._params = None
+
+    def _orbit_rows(self, state):
+        # Top-level bodies that actually orbit something
+        return np.flatnonzero((state.parent < 0) & (state.distance > 0))
+
+    def is_stale(self, state, rows):
+        if self._params is None or not np.array_equal(rows, self.rows):
+            return True
+        distance, inclination, z_offset = self._params
+        return not (np.array_equal(distance, state.distance[rows])
+                    and np.array_equal(inclination, state.orbital_inclination[rows])
+                    and np.array_equal(z_offset, state.z_offset[rows]))
+
+    def update(self, state, segment_levels=None):
+        # segment_levels: the current LOD segment counts, if they may have
+        # been changed since the last build
+        if segment_levels is not None and not np.array_equal(segment_levels, self.segment_levels):
+            self.segment_levels = np.array(segment_levels, dtype=np.int32)
+            self._params = None
+        rows = self._orbit_rows(state)
+        if self.is_stale(state, rows):
+            self.build(state, rows)
+
+    def build(self, state, rows):
+        distance = state.distance[rows].copy()
+        inclination = state.orbital_inclination[rows].copy()
+        z_offset = state.z_offset[rows].copy()
+        n = len(rows)
+        blocks = []
+        self.first = np.zeros((n, len(self.segment_levels)), dtype=np.int32)
+        base = 0
+        for level, segments in enumerate(self.segment_levels):
+            angle = 2 * np.pi * np.arange(segments) / segments
+            cos_a = np.cos(angle)[None, :]
+            sin_a = np.sin(angle)[None, :]
+            block = np.empty((n, segments, 3), dtype=np.float32)
+            block[..., 0] = distance[:, None] * cos_a
+            block[..., 1] = distance[:, None] * sin_a * np.cos(inclination)[:, None]
+            block[..., 2] = distance[:, None] * sin_a * np.sin(inclination)[:, None] + z_offset[:, None]
+            blocks.append(block.reshape(-1, 3))
+            self.first[:, level] = base + np.arange(n) * segments
+            base += n * segments
+        vertices = np.concatenate(blocks) if blocks else np.zeros((0, 3), dtype=np.float32)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.rows = rows
+        self._params = (distance, inclination, z_offset)
+
+    def bounds(self):
+        # Bounding sphere of every loop: centred on the z offset, radius
+        # equal to the orbit distance
+        distance, _, z_offset = self._params
+        centre = np.zeros((len(distance), 3))
+        centre[:, 2] = z_offset
+        return centre, distance
+
+    def levels_for(self, lod, eye, scale):
+        # Resolution index per orbit from the projected size of its loop
+        centre, distance = self.bounds()
+        dist = np.linalg.norm(centre - eye, axis=1)
+        np.maximum(dist, 1e-6, out=dist)
+        pixels = distance * scale / dist * lod.bias
+        levels = select_levels(pixels, lod.orbit_levels)
+        return np.minimum(levels, len(self.segment_levels) - 1)
+
+    def draw(self, levels, visible=None):
+        # visible optionally masks out loops outside the view
+        loops = np.arange(len(self.rows)) if visible is None else np.flatnonzero(visible)
+        n = len(loops)
+        if n == 0:
+            return
+        first = np.ascontiguousarray(self.first[loops, levels[loops]])
+        count = np.ascontiguousarray(self.segment_levels[levels[loops]])
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glMultiDrawArrays(GL_LINE_LOOP, first, count, n)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def release(self):
+        glDeleteBuffers(1, [self.vbo])
@@ -0,0 +1,126 @@
+import numpy as np
+
+
+def ray_from_screen(x, y, width, height, modelview, projection):
+    # World-space ray through a widget pixel (origin top-left), from the
+    # matrices as returned by glGetFloatv (column-major)
+    view = np.asarray(modelview, dtype=np.float64).reshape(4, 4).T
+    proj = np.asarray(projection, dtype=np.float64).reshape(4, 4).T
+    inverse = np.linalg.inv(proj @ view)
+    ndc_x = 2.0 * x / width - 1.0
+    ndc_y = 1.0 - 2.0 * y / height
+    near = inverse @ np.array([ndc_x, ndc_y, -1.0, 1.0])
+    far = inverse @ np.array([ndc_x, ndc_y, 1.0, 1.0])
+    near = near[:3] / near[3]
+    far = far[:3] / far[3]
+    direction = far - near
+    return near, direction / np.linalg.norm(direction)
+
+
+class BodyPicker:
+    # Ray picking against a uniform grid over body positions. Bodies are
+    # bucketed by cell with one argsort; a query visits only the cells near
+    # the ray and tests their bodies exactly at the current positions.
+    # Bodies keep moving after the grid is built, so every query widens the
+    # search by max_speed * (time since the build) and the grid is rebuilt
+    # once that margin exceeds half a cell. Bodies much larger than a cell
+    # (the Sun) are kept out of the grid and always tested directly.
+    def __init__(self, cells_per_body=1.0, max_cells_per_axis=128):
+        self.cells_per_body = cells_per_body
+        self.max_cells_per_axis = max_cells_per_axis
+        self.built = False
+        self.builds = 0
+
+    def build(self, positions, radius, time=0.0, max_speed=0.0):
+        positions = np.asarray(positions, dtype=np.float64)
+        n = len(positions)
+        self.count = n
+        self.time = time
+        self.max_speed = max_speed
+        self.lo = positions.min(axis=0) if n else np.zeros(3)
+        extent = (positions.max(axis=0) - self.lo) if n else np.ones(3)
+        extent = np.maximum(extent, 1e-6)
+        # About cells_per_body cells per body, capped per axis
+        target = max(n * self.cells_per_body, 1.0)
+        cell = max((np.prod(extent) / target) ** (1.0 / 3.0), extent.max() / self.max_cells_per_axis)
+        self.cell = cell
+        self.dims = np.minimum(np.floor(extent / cell).astype(np.int64) + 1, self.max_cells_per_axis)
+        big = radius > 0.5 * cell
+        self.big = np.flatnonzero(big)
+        small = np.flatnonzero(~big)
+        keys = self._keys(self._cells(positions[small]))
+        order = np.argsort(keys, kind='stable')
+        self.members = small[order]
+        counts = np.bincount(keys, minlength=int(np.prod(self.dims)))
+        self.cell_start = np.concatenate(([0], np.cumsum(counts)))
+        self.built = True
+        self.builds += 1
+
+    def _cells(self, points):
+        cells = np.floor((points - self.lo) / self.cell).astype(np.int64)
+        return np.clip(cells, 0, self.dims - 1)
+
+    def _keys(self, cells):
+        return cells[..., 0] + self.dims[0] * (cells[..., 1] + self.dims[1] * cells[..., 2])
+
+    def margin(self, time):
+        return self.max_speed * abs(time - self.time)
+
+    def is_stale(self, count, time):
+        return not self.built or count != self.count or self.margin(time) > 0.5 * self.cell
+
+    def candidates(self, origin, direction, reach, tolerance, margin):
+        # Bodies in the cells within reach of the ray segment [0, reach]
+        half = 0.5 * self.cell
+        t = np.arange(0.0, reach + half, half)
+        samples = origin + t[:, None] * direction
+        # Widen by the pick cone, the motion margin and the largest small
+        # body, in whole cells
+        width = tolerance * t + margin + half
+        k = int(np.ceil(width.max() / self.cell))
+        inside = np.all((samples >= self.lo - width[:, None]) &
+                        (samples <= self.lo + self.dims * self.cell + width[:, None]), axis=1)
+        if not inside.any():
+            return np.zeros(0, dtype=np.int64)
+        cells = self._cells(samples[inside])
+        offsets = np.stack(np.meshgrid(*[np.arange(-k, k + 1)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+        cells = (cells[:, None, :] + offsets[None, :, :]).reshape(-1, 3)
+        valid = np.all((cells >= 0) & (cells < self.dims), axis=1)
+        keys = np.unique(self._keys(cells[valid]))
+        starts = self.cell_start[keys]
+        lengths = self.cell_start[keys + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        # Concatenate the member ranges of every visited cell
+        ends = np.cumsum(lengths)
+        index = np.arange(total) - np.repeat(ends - lengths, lengths) + np.repeat(starts, lengths)
+        return self.members[index]
+
+    def pick(self, origin, direction, positions, radius, time=0.0, max_speed=0.0,
+             tolerance=0.0, reach=None):
+        # Index of the nearest body hit by the ray, or -1. A body counts as
+        # hit within its radius plus tolerance * distance, so tiny or far
+        # bodies can be clicked within a few pixels.
+        if self.is_stale(len(positions), time):
+            self.build(positions, radius, time, max_speed)
+        if reach is None:
+            far = self.lo + self.dims * self.cell
+            corners = np.array([[a[0], b[1], c[2]] for a in (self.lo, far)
+                                for b in (self.lo, far) for c in (self.lo, far)])
+            reach = np.linalg.norm(corners - origin, axis=1).max()
+        rows = np.concatenate([self.candidates(origin, direction, reach, tolerance,
+                                               self.margin(time)), self.big])
+        if len(rows) == 0:
+            return -1
+        rel = positions[rows] - origin
+        t = rel @ direction
+        perp2 = np.einsum('ij,ij->i', rel, rel) - t * t
+        limit = radius[rows] + tolerance * np.maximum(t, 0.0)
+        hit = (t > 0) & (perp2 <= limit * limit)
+        if not hit.any():
+            return -1
+        # Nearest surface along the ray
+        hits = np.flatnonzero(hit)
+        best = hits[np.argmin(t[hits] - radius[rows][hits])]
+        return int(rows[best])
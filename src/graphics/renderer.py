@@ -0,0 +1,120 @@
+from OpenGL.GL import *
+from OpenGL.GL.shaders import compileProgram, compileShader
+import ctypes
+import os
+import numpy as np
+
+SHADER_DIR = os.path.join(os.path.dirname(__file__), 'shaders')
+
+
+def load_shader(name):
+    with open(os.path.join(SHADER_DIR, name), 'r') as f:
+        return f.read()
+
+
+def build_program(vertex_name, fragment_name):
+    # Raises RuntimeError when the driver rejects the shaders, so callers can
+    # fall back to the fixed-function path
+    return compileProgram(
+        compileShader(load_shader(vertex_name), GL_VERTEX_SHADER),
+        compileShader(load_shader(fragment_name), GL_FRAGMENT_SHADER),
+        validate=False,
+    )
+
+
+def build_instances(positions, radius, color, rotation, out=None):
+    # Pack per-instance attributes into an (N, 8) float32 array:
+    # x, y, z, radius, r, g, b, rotation angle
+    n = len(positions)
+    if out is None or len(out) < n:
+        out = np.empty((n, 8), dtype=np.float32)
+    out = out[:n]
+    out[:, 0:3] = positions
+    out[:, 3] = radius
+    out[:, 4:7] = color
+    out[:, 7] = rotation
+    return out
+
+
+class InstancedSphereRenderer:
+    # Draws every sphere that shares a mesh with one glDrawElementsInstanced
+    # call. Needs a GL 3.3 (compatibility) context.
+    STRIDE = 8 * 4
+
+    def __init__(self):
+        self.program = build_program('instanced_sphere.vert', 'instanced_sphere.frag')
+        self.instance_vbo = glGenBuffers(1)
+        self.capacity = 0
+        self.count = 0
+        self.vaos = {}
+        self.uniforms = {
+            name: glGetUniformLocation(self.program, name)
+            for name in ('u_view', 'u_projection', 'u_light_position',
+                         'u_ambient', 'u_diffuse', 'u_scene_ambient')
+        }
+
+    def _vao(self, mesh):
+        vao = self.vaos.get(id(mesh))
+        if vao is not None:
+            return vao
+        vao = glGenVertexArrays(1)
+        glBindVertexArray(vao)
+        glBindBuffer(GL_ARRAY_BUFFER, mesh.vbo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, mesh.ibo)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        for location in (1, 2):
+            glEnableVertexAttribArray(location)
+            glVertexAttribDivisor(location, 1)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        self.vaos[id(mesh)] = vao
+        return vao
+
+    def upload(self, instances):
+        # Stream this frame's instance data, reallocating only when it grows
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        if len(instances) > self.capacity:
+            self.capacity = max(len(instances), self.capacity * 2)
+            glBufferData(GL_ARRAY_BUFFER, self.capacity * self.STRIDE, None, GL_STREAM_DRAW)
+        if len(instances):
+            glBufferSubData(GL_ARRAY_BUFFER, 0, instances.nbytes, instances)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.count = len(instances)
+
+    def begin(self, view, projection, light_position, ambient, diffuse, scene_ambient=0.2):
+        glUseProgram(self.program)
+        glUniformMatrix4fv(self.uniforms['u_view'], 1, GL_FALSE, view)
+        glUniformMatrix4fv(self.uniforms['u_projection'], 1, GL_FALSE, projection)
+        glUniform3f(self.uniforms['u_light_position'], *light_position)
+        glUniform1f(self.uniforms['u_ambient'], ambient)
+        glUniform1f(self.uniforms['u_diffuse'], diffuse)
+        glUniform1f(self.uniforms['u_scene_ambient'], scene_ambient)
+
+    def draw(self, mesh, first=0, count=None):
+        # Draw instances [first, first + count) of the uploaded buffer
+        if count is None:
+            count = self.count - first
+        if count <= 0:
+            return
+        glBindVertexArray(self._vao(mesh))
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        # Level counts come from NumPy; ctypes only takes a plain int
+        offset = int(first) * self.STRIDE
+        glVertexAttribPointer(1, 4, GL_FLOAT, GL_FALSE, self.STRIDE, ctypes.c_void_p(offset))
+        glVertexAttribPointer(2, 4, GL_FLOAT, GL_FALSE, self.STRIDE, ctypes.c_void_p(offset + 16))
+        glDrawElementsInstanced(GL_TRIANGLES, mesh.index_count, GL_UNSIGNED_INT, None, count)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def end(self):
+        glUseProgram(0)
+
+    def release(self):
+        for vao in self.vaos.values():
+            glDeleteVertexArrays(1, [vao])
+        self.vaos.clear()
+        glDeleteBuffers(1, [self.instance_vbo])
+        glDeleteProgram(self.program)
@@ -0,0 +1,20 @@
+#version 330 core
+
+in vec3 v_normal;
+in vec3 v_world;
+in vec3 v_color;
+
+uniform vec3 u_light_position;
+uniform float u_ambient;
+uniform float u_diffuse;
+// Matches the fixed-function default GL_LIGHT_MODEL_AMBIENT
+uniform float u_scene_ambient;
+
+out vec4 frag_color;
+
+void main()
+{
+    vec3 to_light = normalize(u_light_position - v_world);
+    float lambert = max(dot(normalize(v_normal), to_light), 0.0);
+    frag_color = vec4(v_color * (u_scene_ambient + u_ambient + u_diffuse * lambert), 1.0);
+}
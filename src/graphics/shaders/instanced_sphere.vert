@@ -0,0 +1,28 @@
+#version 330 core
+
+// Unit sphere vertex; on a unit sphere this is also the normal
+layout(location = 0) in vec3 a_position;
+// Per instance: world centre + radius, colour + spin angle about z
+layout(location = 1) in vec4 a_center_radius;
+layout(location = 2) in vec4 a_color_rotation;
+
+uniform mat4 u_view;
+uniform mat4 u_projection;
+
+out vec3 v_normal;
+out vec3 v_world;
+out vec3 v_color;
+
+void main()
+{
+    float c = cos(a_color_rotation.w);
+    float s = sin(a_color_rotation.w);
+    vec3 n = vec3(c * a_position.x - s * a_position.y,
+                  s * a_position.x + c * a_position.y,
+                  a_position.z);
+    vec3 world = a_center_radius.xyz + n * a_center_radius.w;
+    v_normal = n;
+    v_world = world;
+    v_color = a_color_rotation.rgb;
+    gl_Position = u_projection * u_view * vec4(world, 1.0);
+}
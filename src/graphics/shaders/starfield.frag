@@ -0,0 +1,11 @@
+#version 120
+
+void main()
+{
+    // Round point sprites with a soft edge
+    vec2 c = gl_PointCoord - vec2(0.5);
+    float r2 = dot(c, c);
+    if (r2 > 0.25)
+        discard;
+    gl_FragColor = vec4(gl_Color.rgb, gl_Color.a * (1.0 - 2.0 * r2));
+}
@@ -0,0 +1,11 @@
+#version 120
+
+// Point size per star, from its magnitude
+attribute float a_size;
+
+void main()
+{
+    gl_Position = gl_ModelViewProjectionMatrix * gl_Vertex;
+    gl_FrontColor = gl_Color;
+    gl_PointSize = a_size;
+}
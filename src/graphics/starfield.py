@@ -0,0 +1,98 @@
+from OpenGL.GL import *
+import ctypes
+import numpy as np
+
+from .renderer import build_program
+
+
+def generate_stars(count, seed=None, radius=90.0, faintest=6.5, brightest=-1.5):
+    # Stars on a sphere around the camera with a realistic magnitude spread:
+    # the number of stars brighter than m grows roughly as 10^(0.6 m), so
+    # most are faint and a few are bright.
+    rng = np.random.default_rng(seed)
+    directions = rng.normal(size=(count, 3))
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    low, high = 10 ** (0.6 * brightest), 10 ** (0.6 * faintest)
+    magnitudes = np.log10(low + rng.random(count) * (high - low)) / 0.6
+    brightness = np.clip(10 ** (-0.4 * (magnitudes - 2.0)), 0.15, 1.0)
+    # Slight blue/yellow tint variation
+    tint = rng.uniform(-0.15, 0.15, count)
+    colors = np.empty((count, 3), dtype=np.float32)
+    colors[:, 0] = brightness * (1.0 + tint)
+    colors[:, 1] = brightness
+    colors[:, 2] = brightness * (1.0 - tint)
+    np.clip(colors, 0.0, 1.0, out=colors)
+    sizes = 1.0 + 2.5 * np.clip((faintest - magnitudes) / (faintest - brightest), 0.0, 1.0) ** 2
+    # Sorted by size so the fallback path can draw contiguous size buckets
+    order = np.argsort(sizes)
+    data = np.empty((count, 7), dtype=np.float32)
+    data[:, 0:3] = directions[order] * radius
+    data[:, 3:6] = colors[order]
+    data[:, 6] = sizes[order]
+    return data
+
+
+class Starfield:
+    # Static background stars in one vertex buffer, drawn skybox-style with
+    # only the camera rotation so they never move with zoom or follow.
+    STRIDE = 7 * 4
+
+    def __init__(self, count=2000, seed=None, radius=90.0):
+        self.data = generate_stars(count, seed=seed, radius=radius)
+        self.count = count
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.data.nbytes, self.data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        try:
+            self.program = build_program('starfield.vert', 'starfield.frag')
+            self.size_location = glGetAttribLocation(self.program, 'a_size')
+        except Exception as e:
+            print("Starfield shader unavailable, using point size buckets:", e)
+            self.program = None
+        # Fallback: a few (first, count, size) runs of similar size
+        sizes = self.data[:, 6]
+        edges = np.searchsorted(sizes, [1.5, 2.25, 3.0])
+        bounds = np.concatenate(([0], edges, [count]))
+        self.buckets = [(int(a), int(b - a), float(sizes[a:b].mean()))
+                        for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    def draw(self):
+        # Rotation-only modelview: strip the camera translation
+        modelview = np.array(glGetFloatv(GL_MODELVIEW_MATRIX), dtype=np.float32).reshape(4, 4)
+        modelview[3, :3] = 0.0
+        glPushMatrix()
+        glLoadMatrixf(modelview)
+        glPushAttrib(GL_ENABLE_BIT | GL_DEPTH_BUFFER_BIT | GL_POINT_BIT)
+        glDisable(GL_LIGHTING)
+        glDepthMask(GL_FALSE)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, self.STRIDE, None)
+        glColorPointer(3, GL_FLOAT, self.STRIDE, ctypes.c_void_p(12))
+        if self.program is not None:
+            glEnable(GL_VERTEX_PROGRAM_POINT_SIZE)
+            glEnable(GL_POINT_SPRITE)
+            glUseProgram(self.program)
+            glEnableVertexAttribArray(self.size_location)
+            glVertexAttribPointer(self.size_location, 1, GL_FLOAT, GL_FALSE, self.STRIDE, ctypes.c_void_p(24))
+            glDrawArrays(GL_POINTS, 0, self.count)
+            glDisableVertexAttribArray(self.size_location)
+            glUseProgram(0)
+        else:
+            for first, count, size in self.buckets:
+                glPointSize(size)
+                glDrawArrays(GL_POINTS, first, count)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glPopAttrib()
+        glPopMatrix()
+
+    def release(self):
+        glDeleteBuffers(1, [self.vbo])
+        if self.program is not None:
+            glDeleteProgram(self.program)
@@ -0,0 +1,41 @@
+import numpy as np
+
+
+class ModelMatrices:
+    # Model matrices (move to the body, then spin it counter-clockwise about
+    # its z axis, like the instanced sphere shader) for a fixed set of rows,
+    # rewritten in place every frame into one (N, 4, 4) float32 buffer.
+    # Each matrix is stored column-major, as OpenGL expects, so matrices[k]
+    # goes straight to glMultMatrixf without a copy. Once the rows are set,
+    # update allocates nothing.
+    def __init__(self):
+        self.set_rows(np.zeros(0, dtype=np.int64))
+
+    def set_rows(self, rows):
+        self.rows = np.asarray(rows, dtype=np.int64)
+        n = len(self.rows)
+        # Row k of the buffer belongs to state row self.rows[k]
+        self.slots = {int(row): k for k, row in enumerate(self.rows)}
+        self.matrices = np.zeros((n, 4, 4), dtype=np.float32)
+        # Entries that never change: the spin axis and the homogeneous 1
+        self.matrices[:, 2, 2] = 1.0
+        self.matrices[:, 3, 3] = 1.0
+        self.angles = np.empty(n, dtype=np.float64)
+        self.positions = np.empty((n, 3), dtype=np.float64)
+
+    def update(self, positions, rotation):
+        # positions (rows, 3) and rotation angles for every state row
+        m = self.matrices
+        np.take(rotation, self.rows, out=self.angles)
+        np.take(positions, self.rows, axis=0, out=self.positions)
+        # Column-major, so the stored 3x3 block is the transposed rotation
+        np.cos(self.angles, out=m[:, 0, 0])
+        np.sin(self.angles, out=m[:, 0, 1])
+        np.negative(m[:, 0, 1], out=m[:, 1, 0])
+        m[:, 1, 1] = m[:, 0, 0]
+        # Translation is the last column, i.e. the last row column-major
+        m[:, 3, :3] = self.positions
+        return m
+
+    def matrix(self, row):
+        return self.matrices[self.slots[row]]
@@ -0,0 +1,128 @@
+import argparse
+import sys
+import time
+import numpy as np
+
+# Only the simulation package is imported here, so this runs on machines
+# without a display, PyQt6 or PyOpenGL
+from src.simulation.solar_system import SolarSystem
+from src.simulation.recorder import TrajectoryRecorder
+from src.simulation.snapshot import load_snapshot, save_snapshot
+from src.simulation.kepler import PLANET_ECCENTRICITY, PLANET_PERIAPSIS
+from src.simulation.catalog import load_catalog
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m src.headless',
+        description='Run the solar system simulation without a window and save trajectories.')
+    parser.add_argument('--duration', type=float, default=60.0,
+                        help='time to simulate, in SolarSystem.update units '
+                             '(the window advances 1.0 per second at speed 1)')
+    parser.add_argument('--step', type=float, default=0.016, help='fixed step size')
+    parser.add_argument('--every', type=int, default=1, help='save every Nth step')
+    parser.add_argument('--output', default='trajectories.npz',
+                        help='output file (.npz or .csv)')
+    parser.add_argument('--record', default=None, metavar='DIR',
+                        help='also stream time, position and velocity records into '
+                             'a chunked memory-mapped recording in this directory')
+    parser.add_argument('--resume', default=None, metavar='SNAPSHOT',
+                        help='start from a snapshot instead of the default system')
+    parser.add_argument('--checkpoint', default=None, metavar='SNAPSHOT',
+                        help='save the final state to this snapshot file')
+    parser.add_argument('--gravity', default=None, metavar='INTEGRATOR',
+                        help='use the N-body engine with this integrator '
+                             '(leapfrog, yoshida4, rk45) instead of circular orbits')
+    parser.add_argument('--kepler', action='store_true',
+                        help='closed-form Keplerian orbits with the real eccentricities '
+                             'instead of stepped circular orbits')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the random starting angles, for reproducible runs')
+    parser.add_argument('--asteroids', type=int, default=0,
+                        help='add this many massless asteroids between Mars and Jupiter')
+    parser.add_argument('--catalog', action='append', default=[], metavar='FILE',
+                        help='add the bodies of a CSV, JSON or binary (.pscat) catalog; '
+                             'may be given more than once')
+    return parser.parse_args(argv)
+
+
+def build_system(args):
+    if args.resume:
+        # A snapshot already holds its bodies and physics settings
+        return load_snapshot(args.resume)
+    system = SolarSystem(seed=args.seed)
+    if args.asteroids:
+        rng = system.rng
+        system.add_bodies(
+            [f"Asteroid {i}" for i in range(args.asteroids)],
+            radius=0.05,
+            distance=rng.uniform(6.5, 7.5, args.asteroids),
+            orbital_period=rng.uniform(3.0, 6.0, args.asteroids),
+            orbital_inclination=rng.uniform(-0.1, 0.1, args.asteroids),
+        )
+    for path in args.catalog:
+        load_catalog(system, path)
+    if args.gravity:
+        system.enable_gravity(args.gravity)
+    elif args.kepler:
+        system.enable_ephemeris(eccentricities=PLANET_ECCENTRICITY, periapsis=PLANET_PERIAPSIS)
+    return system
+
+
+def run(system, duration, step, every=1):
+    # Returns (times, positions) with positions of shape (frames, bodies, 3)
+    steps = int(round(duration / step))
+    frames = steps // every + 1
+    n = len(system.state)
+    times = np.empty(frames)
+    positions = np.empty((frames, n, 3), dtype=np.float32)
+    # Resumed runs continue the clock of the snapshot
+    start = system.time / system.slow_factor
+    times[0] = start
+    positions[0] = system.state.world_positions()
+    frame = 1
+    for i in range(1, steps + 1):
+        system.update(step)
+        if i % every == 0:
+            times[frame] = start + i * step
+            positions[frame] = system.state.world_positions()
+            frame += 1
+    return times[:frame], positions[:frame]
+
+
+def save(path, names, times, positions):
+    if path.endswith('.csv'):
+        with open(path, 'w') as f:
+            f.write('time,body,x,y,z\n')
+            for t, frame in zip(times, positions):
+                for name, (x, y, z) in zip(names, frame):
+                    f.write(f'{t:.6f},{name},{x:.6f},{y:.6f},{z:.6f}\n')
+    else:
+        np.savez(path, names=np.array(names), times=times, positions=positions)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    system = build_system(args)
+    recorder = None
+    if args.record:
+        recorder = TrajectoryRecorder.attach(system, args.record, every=args.every)
+    start = time.perf_counter()
+    times, positions = run(system, args.duration, args.step, args.every)
+    elapsed = time.perf_counter() - start
+    if recorder is not None:
+        recorder.close()
+        print(f"Recorded {recorder.frames} frames to {args.record}")
+    save(args.output, system.state.names, times, positions)
+    if args.checkpoint:
+        save_snapshot(system, args.checkpoint)
+    steps = int(round(args.duration / args.step))
+    print(f"Simulated {len(system.state)} bodies for {steps} steps in {elapsed:.2f}s "
+          f"({steps / max(elapsed, 1e-9):.0f} steps/s), wrote {len(times)} frames to {args.output}")
+    if system.physics is not None:
+        print(f"Relative energy drift: {system.energy_drift():.3e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,29 @@
+import argparse
 import sys
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QSurfaceFormat
 from src.ui.main_window import MainWindow
 
 def main():
-    app = QApplication(sys.argv)
+    # --seed N fixes the random starting angles; other arguments go to Qt
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--seed', type=int, default=None)
+    args, qt_args = parser.parse_known_args()
+    # Ask for GL 3.3 with the compatibility profile so the instanced shader
+    # path and the fixed-function calls can share one context
+    fmt = QSurfaceFormat()
+    fmt.setVersion(3, 3)
+    fmt.setProfile(QSurfaceFormat.OpenGLContextProfile.CompatibilityProfile)
+    fmt.setDepthBufferSize(24)
+    QSurfaceFormat.setDefaultFormat(fmt)
+    app = QApplication(sys.argv[:1] + qt_args)
     # Load and apply QSS stylesheet
     try:
         with open("style.qss", "r") as f:
             app.setStyleSheet(f.read())
     except Exception as e:
         print("Could not load style.qss:", e)
-    window = MainWindow()
+    window = MainWindow(seed=args.seed)
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,122 @@
+import collections
+import contextlib
+import csv
+import json
+import threading
+import time
+
+
+class FrameProfiler:
+    # Per-frame timings of named stages plus draw-call and vertex counts.
+    # Stages add up between two end_frame calls, so work done in the timer
+    # callback and in paintGL lands in the same frame. Whatever part of the
+    # frame the top-level stages do not cover is reported as 'other' (Qt
+    # event handling, buffer swaps, idle time). The last `window` frames
+    # feed the rolling averages; up to `history` frames are kept for export.
+    def __init__(self, window=120, history=36000, top_stages=('animate', 'paint')):
+        self.window = window
+        self.top_stages = top_stages
+        self.frames = collections.deque(maxlen=history)
+        self.enabled = True
+        # Stages may be timed from the simulation thread too
+        self.lock = threading.Lock()
+        self.stages = collections.defaultdict(float)
+        self.draw_calls = 0
+        self.vertices = 0
+        self.last_end = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name] += elapsed
+
+    def draw(self, vertices, calls=1):
+        # Count one or more draw calls and the vertices they submit
+        self.draw_calls += calls
+        self.vertices += int(vertices)
+
+    def end_frame(self):
+        now = time.perf_counter()
+        if self.enabled and self.last_end is not None:
+            frame = now - self.last_end
+            with self.lock:
+                stages = {name: 1000.0 * t for name, t in self.stages.items()}
+                self.stages = collections.defaultdict(float)
+            covered = sum(stages.get(name, 0.0) for name in self.top_stages)
+            stages['other'] = max(1000.0 * frame - covered, 0.0)
+            self.frames.append({'time': now, 'frame_ms': 1000.0 * frame, 'stages': stages,
+                                'draw_calls': self.draw_calls, 'vertices': self.vertices})
+        else:
+            with self.lock:
+                self.stages = collections.defaultdict(float)
+        self.draw_calls = 0
+        self.vertices = 0
+        self.last_end = now
+
+    def clear(self):
+        self.frames.clear()
+        self.last_end = None
+
+    def recent(self):
+        n = min(self.window, len(self.frames))
+        return [self.frames[i] for i in range(len(self.frames) - n, len(self.frames))]
+
+    def fps(self):
+        frames = self.recent()
+        total = sum(f['frame_ms'] for f in frames)
+        return 1000.0 * len(frames) / total if total > 0 else 0.0
+
+    def averages(self):
+        # Mean milliseconds per stage over the rolling window
+        frames = self.recent()
+        totals = collections.defaultdict(float)
+        for f in frames:
+            for name, ms in f['stages'].items():
+                totals[name] += ms
+        return {name: ms / len(frames) for name, ms in totals.items()}
+
+    def summary(self):
+        # Text for the overlay
+        frames = self.recent()
+        if not frames:
+            return "Profiling..."
+        last = frames[-1]
+        frame_ms = sum(f['frame_ms'] for f in frames) / len(frames)
+        lines = [f"FPS {self.fps():.1f}  frame {frame_ms:.2f} ms",
+                 f"draw calls {last['draw_calls']}  vertices {last['vertices']}"]
+        for name, ms in sorted(self.averages().items(), key=lambda item: -item[1]):
+            lines.append(f"{name:<10} {ms:7.2f} ms")
+        return "\n".join(lines)
+
+    def stage_names(self):
+        names = []
+        for f in self.frames:
+            for name in f['stages']:
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def export(self, path):
+        # Every kept frame as CSV (one column per stage) or JSON, chosen by
+        # the file extension
+        if path.lower().endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({'fps': self.fps(), 'averages_ms': self.averages(),
+                           'frames': list(self.frames)}, f, indent=1)
+            return
+        names = self.stage_names()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['time', 'frame_ms', 'draw_calls', 'vertices'] + [n + '_ms' for n in names])
+            for frame in self.frames:
+                writer.writerow([f"{frame['time']:.6f}", f"{frame['frame_ms']:.4f}",
+                                 frame['draw_calls'], frame['vertices']]
+                                + [f"{frame['stages'].get(n, 0.0):.4f}" for n in names])
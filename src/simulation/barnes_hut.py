@@ -0,0 +1,262 @@
+import time
+import numpy as np
+
+from .physics import DirectSummation
+
+
+def _spread_bits(v):
+    # Insert two zero bits between each of the low 21 bits (Morton encoding)
+    v = v & 0x1fffff
+    v = (v | (v << 32)) & 0x1f00000000ffff
+    v = (v | (v << 16)) & 0x1f0000ff0000ff
+    v = (v | (v << 8)) & 0x100f00f00f00f00f
+    v = (v | (v << 4)) & 0x10c30c30c30c30c3
+    v = (v | (v << 2)) & 0x1249249249249249
+    return v
+
+
+def _expand(counts):
+    # For groups of the given sizes return (group index, offset in group)
+    # for every element, the vectorized form of a nested loop
+    total = int(counts.sum())
+    group = np.repeat(np.arange(len(counts)), counts)
+    offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return group, offset
+
+
+class Octree:
+    # Linear octree built from Morton-sorted particles. Nodes are stored
+    # level by level in flat arrays; the particles of every node, and the
+    # children of every internal node, are contiguous ranges.
+    def __init__(self, positions, masses, leaf_size=16, max_depth=16):
+        self.max_depth = max_depth
+        lo = positions.min(axis=0)
+        size = float((positions.max(axis=0) - lo).max()) * (1 + 1e-9)
+        if size == 0:
+            size = 1.0
+        self.lo = lo
+        self.scale = (1 << max_depth) / size
+        keys = self.keys_for(positions)
+        order = np.argsort(keys, kind='stable')
+        self.order = order
+        self.keys = keys[order]
+        self.positions = positions[order]
+        self.masses = masses[order]
+        weighted = self.positions * self.masses[:, None]
+
+        starts, ends, sizes, levels = [], [], [], []
+        n = len(self.keys)
+        for level in range(max_depth + 1):
+            cell = self.keys >> (3 * (max_depth - level))
+            first = np.concatenate(([0], np.flatnonzero(np.diff(cell)) + 1))
+            last = np.append(first[1:], n)
+            starts.append(first)
+            ends.append(last)
+            sizes.append(np.full(len(first), size / (1 << level)))
+            levels.append(level)
+            # Stop once every cell at this level would be a leaf
+            if (last - first).max() <= leaf_size:
+                break
+
+        self.level_offset = np.cumsum([0] + [len(s) for s in starts])
+        self.start = np.concatenate(starts)
+        self.end = np.concatenate(ends)
+        self.size = np.concatenate(sizes)
+        self.count = self.end - self.start
+        self.mass = np.add.reduceat(self.masses, self.start)
+        com = np.add.reduceat(weighted, self.start, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            com /= self.mass[:, None]
+        # Massless cells fall back to their first particle
+        empty = ~np.isfinite(com).all(axis=1)
+        com[empty] = self.positions[self.start[empty]]
+        self.com = com
+
+        # Children of a node are the nodes on the next level whose particle
+        # range starts inside the parent's range
+        total = len(self.start)
+        self.child_first = np.zeros(total, dtype=np.int64)
+        self.child_last = np.zeros(total, dtype=np.int64)
+        depth = len(starts)
+        for level in range(depth - 1):
+            a, b = self.level_offset[level], self.level_offset[level + 1]
+            c = self.level_offset[level + 2]
+            next_starts = self.start[b:c]
+            self.child_first[a:b] = b + np.searchsorted(next_starts, self.start[a:b])
+            self.child_last[a:b] = b + np.searchsorted(next_starts, self.end[a:b])
+        self.is_leaf = (self.count <= leaf_size) | (self.child_first == self.child_last)
+
+    def keys_for(self, points):
+        # Morton keys of arbitrary points on this tree's grid
+        cells = 1 << self.max_depth
+        ijk = ((points - self.lo) * self.scale).astype(np.int64)
+        np.clip(ijk, 0, cells - 1, out=ijk)
+        return (_spread_bits(ijk[:, 0]) << 2) | (_spread_bits(ijk[:, 1]) << 1) | _spread_bits(ijk[:, 2])
+
+    def __len__(self):
+        return len(self.start)
+
+
+class BarnesHut:
+    # Approximate O(N log N) gravity. A node is used as a point mass when
+    # size / distance < theta; smaller theta is more accurate and slower.
+    # Same interface as DirectSummation so either can be handed to
+    # NBodySystem. Only bodies with mass go into the tree, so massless test
+    # particles only add to the evaluation, not to the tree.
+    #
+    # Targets are walked in groups of group_size neighbours in Morton order:
+    # the tree is opened once per group, against the group's bounding box,
+    # and every group then meets its interaction list (node centres of mass
+    # and leaf particles) as one dense block. That keeps the per-pair work
+    # in a few BLAS products instead of gathered temporaries.
+    def __init__(self, theta=0.5, softening=1e-3, leaf_size=8, max_depth=16, group_size=256):
+        self.theta = theta
+        self.softening = softening
+        self.leaf_size = leaf_size
+        self.max_depth = max_depth
+        self.group_size = group_size
+        self.tree = None
+
+    def build(self, positions, masses):
+        sources = np.flatnonzero(masses > 0)
+        self.tree = Octree(positions[sources], masses[sources], self.leaf_size, self.max_depth)
+        return self.tree
+
+    def accelerations(self, positions, masses, G, out=None, targets=None):
+        target_pos = positions if targets is None else positions[targets]
+        n = len(target_pos)
+        if out is None:
+            out = np.empty((n, 3), dtype=np.float64)
+        out.fill(0.0)
+        if not (masses > 0).any() or n == 0:
+            return out
+        tree = self.build(positions, masses)
+        keys = tree.keys_for(target_pos)
+        order = np.argsort(keys, kind='stable')
+        points = target_pos[order]
+        bounds = self._groups(keys[order], tree.max_depth)
+        lo = np.minimum.reduceat(points, bounds[:-1], axis=0)
+        hi = np.maximum.reduceat(points, bounds[:-1], axis=0)
+        src_pos, src_mass, first = self._interactions(tree, 0.5 * (lo + hi), 0.5 * (hi - lo))
+        eps2 = self.softening ** 2
+        # Source positions with a column of ones, so one product gives both
+        # sum_j w_ij s_j and sum_j w_ij
+        src = np.ones((len(src_pos), 4))
+        acc = np.empty((n, 3))
+        for g in range(len(bounds) - 1):
+            a, b = bounds[g], bounds[g + 1]
+            j, k = first[g], first[g + 1]
+            # Relative to the group centre, so r2 from the expanded dot
+            # product does not lose precision far from the origin
+            centre = 0.5 * (lo[g] + hi[g])
+            tp = points[a:b] - centre
+            sp = src[j:k]
+            np.subtract(src_pos[j:k], centre, out=sp[:, :3])
+            r2 = tp @ (-2.0 * sp[:, :3].T)
+            r2 += (np.einsum('ij,ij->i', tp, tp) + eps2)[:, None]
+            r2 += np.einsum('ij,ij->i', sp[:, :3], sp[:, :3])
+            w = np.sqrt(r2)
+            w *= r2
+            np.divide(src_mass[j:k], w, out=w)
+            # sum_j w_ij (s_j - t_i) without forming the (k, M, 3) differences
+            sums = w @ sp
+            acc[a:b] = sums[:, :3] - tp * sums[:, 3:]
+        out[order] = acc
+        out *= G
+        return out
+
+    def _groups(self, keys, max_depth):
+        # Split Morton-sorted targets into octree cells of at most group_size
+        # targets (the largest such cell around each target), so every group
+        # has a tight bounding box. Returns group boundaries.
+        n = len(keys)
+        label = np.full(n, -1, dtype=np.int64)
+        for level in range(max_depth + 1):
+            cell = keys >> (3 * (max_depth - level))
+            first = np.concatenate(([0], np.flatnonzero(np.diff(cell)) + 1))
+            sizes = np.diff(np.append(first, n))
+            run_start = np.repeat(first, sizes)
+            free = (label < 0) & (np.repeat(sizes, sizes) <= self.group_size)
+            label[free] = run_start[free]
+            if (label >= 0).all():
+                break
+        # Targets sharing a deepest cell (coincident points) stay together
+        rest = label < 0
+        label[rest] = np.repeat(first, sizes)[rest]
+        return np.append(np.flatnonzero(np.diff(label, prepend=-1)), n)
+
+    def _interactions(self, tree, centre, half):
+        # Breadth-first walk of (group, node) pairs. A node is accepted as a
+        # point mass when it is far enough from the nearest point of the
+        # group's box; unaccepted leaves contribute their particles. Returns
+        # the sources of every group, concatenated, with group offsets.
+        theta2 = self.theta ** 2
+        groups = len(centre)
+        group = np.arange(groups)
+        node = np.zeros(groups, dtype=np.int64)
+        found_group, found_pos, found_mass = [], [], []
+        while len(group):
+            gap = np.abs(tree.com[node] - centre[group]) - half[group]
+            np.maximum(gap, 0.0, out=gap)
+            r2 = np.einsum('ij,ij->i', gap, gap)
+            size = tree.size[node]
+            accept = (size * size < theta2 * r2) | (tree.count[node] == 1)
+            found_group.append(group[accept])
+            found_pos.append(tree.com[node[accept]])
+            found_mass.append(tree.mass[node[accept]])
+            rest = ~accept
+            leaf = rest & tree.is_leaf[node]
+            if leaf.any():
+                leaf_nodes = node[leaf]
+                counts = tree.count[leaf_nodes]
+                index, offset = _expand(counts)
+                src = tree.start[leaf_nodes][index] + offset
+                found_group.append(np.repeat(group[leaf], counts))
+                found_pos.append(tree.positions[src])
+                found_mass.append(tree.masses[src])
+            opened = rest & ~leaf
+            parents = node[opened]
+            index, offset = _expand(tree.child_last[parents] - tree.child_first[parents])
+            node = tree.child_first[parents][index] + offset
+            group = group[opened][index]
+        found_group = np.concatenate(found_group)
+        order = np.argsort(found_group, kind='stable')
+        first = np.searchsorted(found_group[order], np.arange(groups + 1))
+        return np.concatenate(found_pos)[order], np.concatenate(found_mass)[order], first
+
+
+def compare_with_direct(positions, masses, thetas=(0.3, 0.5, 0.7, 1.0), G=1.0,
+                        softening=1e-3, sample_size=1000, seed=0):
+    # Accuracy versus speed of Barnes-Hut at several opening angles, measured
+    # against exact direct summation on a random sample of targets. speedup
+    # is the estimated direct time over the Barnes-Hut time at this N; below
+    # 1, direct summation is the better choice (around 1-2k bodies here).
+    # The direct estimate is scaled linearly from the sample, so it is only
+    # a rough guide for N under a few thousand.
+    positions = np.asarray(positions, dtype=np.float64)
+    masses = np.asarray(masses, dtype=np.float64)
+    n = len(positions)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(n, size=min(sample_size, n), replace=False)
+    direct = DirectSummation(softening=softening)
+    start = time.perf_counter()
+    exact = direct.accelerations(positions, masses, G, targets=sample)
+    direct_seconds = (time.perf_counter() - start) * n / len(sample)
+    exact_norm = np.linalg.norm(exact, axis=1)
+    exact_norm[exact_norm == 0] = 1.0
+    results = {'n': n, 'direct_seconds_estimate': direct_seconds, 'theta': {}}
+    for theta in thetas:
+        solver = BarnesHut(theta=theta, softening=softening)
+        start = time.perf_counter()
+        approx = solver.accelerations(positions, masses, G)
+        seconds = time.perf_counter() - start
+        error = np.linalg.norm(approx[sample] - exact, axis=1) / exact_norm
+        results['theta'][theta] = {
+            'seconds': seconds,
+            'speedup': direct_seconds / seconds if seconds > 0 else float('inf'),
+            'nodes': len(solver.tree),
+            'median_relative_error': float(np.median(error)),
+            'p99_relative_error': float(np.percentile(error, 99)),
+            'max_relative_error': float(error.max()),
+        }
+    return results
@@ -0,0 +1,274 @@
+import csv
+import gc
+import io
+import json
+import os
+import numpy as np
+
+from .celestial_bodies import CelestialBody
+from .registry import BODY_TYPES
+from .snapshot import array_views, read_array_header, write_arrays
+
+# Compact binary catalogs and the pre-parsed cache of text catalogs share
+# the snapshot file layout under their own magic
+MAGIC = b'PSCAT001'
+CACHE_SUFFIX = '.pscat'
+
+# Numeric columns copied into OrbitalState, with the value used when a
+# catalog leaves one out. Angles are radians; a missing angle column gets
+# random starting angles from the system's rng.
+NUMERIC_COLUMNS = {
+    'radius': 0.05, 'distance': None, 'orbital_period': 1.0, 'orbital_inclination': 0.0,
+    'rotation_period': 1.0, 'mass': 0.0, 'z_offset': 0.0, 'angle': None,
+}
+# Optional text columns: parent body name, body type and '#rrggbb' colour
+# (or separate red, green and blue columns in 0..1)
+TEXT_COLUMNS = ('name', 'parent', 'type', 'color')
+RGB_COLUMNS = ('red', 'green', 'blue')
+
+
+class Catalog:
+    # A body catalog as columns: names, numeric arrays by column name and
+    # optional parent names, type codes and colours. Columns a catalog file
+    # has but PySolarSim does not use are never parsed.
+    def __init__(self, names, columns, parents=None, types=None, colors=None):
+        self.names = names
+        self.columns = columns
+        self.parents = parents
+        self.types = types
+        self.colors = colors
+
+    def __len__(self):
+        return len(self.names)
+
+
+def _type_codes(values):
+    # BODY_TYPES index per value; -1 where the type is left empty
+    unique, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    codes = np.empty(len(unique), dtype=np.int8)
+    for i, name in enumerate(unique):
+        key = name.strip().lower().replace(' ', '_')
+        if key and key not in BODY_TYPES:
+            raise ValueError(f"Unknown body type {name!r}; expected one of {BODY_TYPES}")
+        codes[i] = BODY_TYPES.index(key) if key else -1
+    return codes[inverse]
+
+
+def _hex_colors(values):
+    unique, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    table = np.empty((len(unique), 3), dtype=np.float32)
+    for i, value in enumerate(unique):
+        # Grey, like add_bodies, where the colour is left empty
+        rgb = int(value.strip().lstrip('#') or 'b3b3b3', 16)
+        table[i] = ((rgb >> 16) & 255, (rgb >> 8) & 255, rgb & 255)
+    return table[inverse] / 255.0
+
+
+def _from_columns(numeric, text):
+    # Build a Catalog from parsed columns: numeric maps column -> float
+    # array, text maps column -> list of strings
+    if 'name' not in text:
+        raise ValueError("A catalog needs a 'name' column")
+    if 'distance' not in numeric:
+        raise ValueError("A catalog needs a 'distance' column")
+    names = list(text['name'])
+    columns = {key: numeric[key] for key in NUMERIC_COLUMNS if key in numeric}
+    parents = list(text['parent']) if 'parent' in text else None
+    types = _type_codes(text['type']) if 'type' in text else None
+    colors = None
+    if 'color' in text:
+        colors = _hex_colors(text['color'])
+    elif all(key in numeric for key in RGB_COLUMNS):
+        colors = np.stack([numeric[key] for key in RGB_COLUMNS], axis=1).astype(np.float32)
+    return Catalog(names, columns, parents, types, colors)
+
+
+def _wanted(header):
+    numeric = [i for i, key in enumerate(header) if key in NUMERIC_COLUMNS or key in RGB_COLUMNS]
+    text = [i for i, key in enumerate(header) if key in TEXT_COLUMNS]
+    return numeric, text
+
+
+def parse_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        text = f.read()
+    lines = text.splitlines()
+    header = [key.strip() for key in next(csv.reader(lines[:1]))] if lines else []
+    numeric_idx, text_idx = _wanted(header)
+    rows = lines[1:]
+    if '"' in text:
+        # Quoted fields may hold commas: parse properly, column by column
+        records = list(csv.reader(rows))
+        numeric = {header[i]: np.array([r[i] for r in records], dtype=np.float64)
+                   for i in numeric_idx}
+        strings = {header[i]: [r[i] for r in records] for i in text_idx}
+        return _from_columns(numeric, strings)
+    # Plain CSV: NumPy's C parser reads every numeric column in one pass and
+    # text columns come from a single split per line
+    numeric = {}
+    if numeric_idx and rows:
+        values = np.loadtxt(io.StringIO(text), delimiter=',', skiprows=1,
+                            usecols=numeric_idx, dtype=np.float64, ndmin=2)
+        numeric = {header[i]: values[:, k] for k, i in enumerate(numeric_idx)}
+    strings = {header[i]: [] for i in text_idx}
+    # Millions of small lists would otherwise set off the cyclic garbage
+    # collector over and over, which costs more than the splitting itself
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        split = [line.split(',') for line in rows]
+        for i in text_idx:
+            strings[header[i]] = [fields[i] for fields in split]
+        del split
+    finally:
+        if enabled:
+            gc.enable()
+    return _from_columns(numeric, strings)
+
+
+def parse_json(path):
+    # Either column-oriented ({"name": [...], "distance": [...]}, optionally
+    # under "columns") or a list of body objects (optionally under "bodies")
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('columns', data.get('bodies', data))
+    if isinstance(data, list):
+        keys = {}
+        for body in data:
+            keys.update(dict.fromkeys(body))
+        data = {key: [body.get(key) for body in data] for key in keys}
+    # Values a body leaves out become NaN (numbers) or '' (text) and get
+    # the defaults in load_catalog
+    numeric = {key: np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+               for key, values in data.items() if key in NUMERIC_COLUMNS or key in RGB_COLUMNS}
+    text = {key: ['' if v is None else str(v) for v in values] for key, values in data.items()
+            if key in TEXT_COLUMNS}
+    return _from_columns(numeric, text)
+
+
+def save_catalog(catalog, path, source=None):
+    # Write a catalog in the compact binary format: every column as a raw
+    # array, text columns as NUL-separated blobs
+    arrays = dict(catalog.columns)
+    arrays['names'] = np.frombuffer('\0'.join(catalog.names).encode('utf-8'), dtype=np.uint8)
+    if catalog.parents is not None:
+        arrays['parents'] = np.frombuffer('\0'.join(catalog.parents).encode('utf-8'), dtype=np.uint8)
+    if catalog.types is not None:
+        arrays['types'] = catalog.types
+    if catalog.colors is not None:
+        arrays['colors'] = catalog.colors
+    header = {'count': len(catalog), 'source': source}
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        write_arrays(f, MAGIC, header, arrays)
+    os.replace(tmp, path)
+
+
+def _read_binary(path):
+    # Columns are memory-mapped, so only the pages actually used are read
+    with open(path, 'rb') as f:
+        header, data_start = read_array_header(f, MAGIC, "PySolarSim catalog")
+    arrays = {}
+    if header['count']:
+        data = np.memmap(path, dtype=np.uint8, mode='r', offset=data_start)
+        arrays = array_views(header, data)
+
+    def strings(key):
+        if key not in arrays:
+            return None
+        return arrays[key].tobytes().decode('utf-8').split('\0')
+
+    columns = {key: arrays[key] for key in NUMERIC_COLUMNS if key in arrays}
+    catalog = Catalog(strings('names') or [], columns, strings('parents'),
+                      arrays.get('types'), arrays.get('colors'))
+    return header, catalog
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_catalog(path, cache=True):
+    # Parse a .csv, .json or binary (.pscat) catalog. Text catalogs are
+    # cached pre-parsed next to the file and the cache is reused until the
+    # file changes.
+    if path.endswith(CACHE_SUFFIX):
+        return _read_binary(path)[1]
+    cache_path = path + CACHE_SUFFIX
+    stamp = _source_stamp(path)
+    if cache and os.path.exists(cache_path):
+        try:
+            header, catalog = _read_binary(cache_path)
+            if header.get('source') == stamp:
+                return catalog
+        except (ValueError, KeyError, OSError):
+            pass
+    if path.lower().endswith('.json'):
+        catalog = parse_json(path)
+    else:
+        catalog = parse_csv(path)
+    if cache:
+        try:
+            save_catalog(catalog, cache_path, source=stamp)
+        except OSError:
+            # Read-only location: just skip the cache
+            pass
+    return catalog
+
+
+def load_catalog(solar_system, source, cache=True, body_type='asteroid', parent=None):
+    # Add every body of a catalog (a path or a Catalog) to solar_system in
+    # one batch and return the slice of new rows. Parent names refer to
+    # earlier rows of the same catalog or to bodies already in the system;
+    # bodies without one orbit parent (a body, row index or None). Rows
+    # without a type column get body_type, or 'moon' when they have a parent.
+    catalog = source if isinstance(source, Catalog) else read_catalog(source, cache)
+    n = len(catalog)
+    state = solar_system.state
+    registry = solar_system.registry
+    start = len(state)
+    default_parent = parent.index if isinstance(parent, CelestialBody) else (
+        -1 if parent is None else int(parent))
+    parents = np.full(n, default_parent, dtype=np.int64)
+    if catalog.parents is not None:
+        unique, inverse = np.unique(np.asarray(catalog.parents, dtype=str), return_inverse=True)
+        wanted = set(unique.tolist())
+        rows = {}
+        for i, name in enumerate(catalog.names):
+            if name in wanted and name not in rows:
+                rows[name] = start + i
+        resolved = np.empty(len(unique), dtype=np.int64)
+        for k, name in enumerate(unique.tolist()):
+            if not name:
+                resolved[k] = default_parent
+                continue
+            index = rows.get(name)
+            if index is None:
+                index = registry.id(name)
+            if index is None:
+                raise KeyError(f"Parent {name!r} is neither in the catalog nor in the system")
+            resolved[k] = index
+        parents = resolved[inverse]
+    types = np.where(parents >= 0, BODY_TYPES.index('moon'),
+                     BODY_TYPES.index(body_type)).astype(np.int8)
+    if catalog.types is not None:
+        types = np.where(catalog.types >= 0, catalog.types, types)
+    fields = {}
+    for key, default in NUMERIC_COLUMNS.items():
+        column = catalog.columns.get(key)
+        if column is None:
+            fields[key] = default
+            continue
+        missing = np.isnan(column)
+        if missing.any():
+            if key == 'distance':
+                raise ValueError("Every catalog body needs a distance")
+            column = column.copy()
+            column[missing] = (solar_system.rng.uniform(0, 2 * np.pi, missing.sum())
+                               if key == 'angle' else default)
+        fields[key] = column
+    color = catalog.colors if catalog.colors is not None else (0.7, 0.7, 0.7)
+    return solar_system.add_bodies(catalog.names, color=color, parent=parents,
+                                   body_type=types, **fields)
@@ -1,54 +1,133 @@
 import numpy as np
 import random
 
-class CelestialBody:
-    def __init__(self, name, radius, distance, color, orbital_period=1.0, 
-                 orbital_inclination=0.0, rotation_period=1.0, mass=1.0):
+
+class _StateField:
+    # Attribute that lives in the body's own value dict until it is bound to
+    # an OrbitalState, then reads and writes the body's row in the shared
+    # arrays
+    def __init__(self, name):
         self.name = name
-        self.radius = radius
-        self.distance = distance
-        self.color = color
-        self.orbital_period = orbital_period
-        self.orbital_inclination = orbital_inclination
-        self.rotation_period = rotation_period
-        self.mass = mass
-        self.angle = random.uniform(0, 2 * np.pi)  # Random initial position
-        self.rotation_angle = 0.0
-        
+
+    def __get__(self, body, owner):
+        if body is None:
+            return self
+        if body.state is None:
+            return body._values[self.name]
+        return float(getattr(body.state, self.name)[body.index])
+
+    def __set__(self, body, value):
+        if body.state is None:
+            body._values[self.name] = value
+        else:
+            getattr(body.state, self.name)[body.index] = value
+            body.state.invalidate()
+
+
+class CelestialBody:
+    # A bound body is only a (state, row) pair: every field, the name and
+    # the colour are read from the OrbitalState arrays, so a view costs a
+    # few dozen bytes and million-row systems can hand them out freely.
+    # Before binding, the values wait in _values.
+    __slots__ = ('state', 'index', '_values')
+
+    radius = _StateField('radius')
+    distance = _StateField('distance')
+    orbital_period = _StateField('orbital_period')
+    orbital_inclination = _StateField('orbital_inclination')
+    rotation_period = _StateField('rotation_period')
+    mass = _StateField('mass')
+    angle = _StateField('angle')
+    rotation_angle = _StateField('rotation_angle')
+    z_offset = _StateField('z_offset')
+
+    def __init__(self, name, radius, distance, color, orbital_period=1.0,
+                 orbital_inclination=0.0, rotation_period=1.0, mass=1.0, angle=None,
+                 z_offset=0.0):
+        self.state = None
+        self.index = None
+        # Random initial position unless given; SolarSystem.add_body redraws
+        # it from its own seeded generator
+        self._values = {
+            'name': name, 'color': color, 'radius': radius, 'distance': distance,
+            'orbital_period': orbital_period, 'orbital_inclination': orbital_inclination,
+            'rotation_period': rotation_period, 'mass': mass,
+            'angle': random.uniform(0, 2 * np.pi) if angle is None else angle,
+            'rotation_angle': 0.0, 'z_offset': z_offset, 'random_angle': angle is None,
+        }
+
+    @classmethod
+    def view(cls, state, index):
+        # Body object for a row that already exists in the state arrays
+        body = cls.__new__(cls)
+        body.state = state
+        body.index = index
+        body._values = None
+        return body
+
+    @property
+    def name(self):
+        if self.state is None:
+            return self._values['name']
+        return self.state.names[self.index]
+
+    @property
+    def color(self):
+        if self.state is None:
+            return self._values['color']
+        return tuple(float(c) for c in self.state.color[self.index])
+
+    @property
+    def random_angle(self):
+        return self.state is None and self._values['random_angle']
+
+    def bind(self, state, parent=-1):
+        # Move this body's values into the shared state arrays
+        fields = {field: self._values[field] for field in state.SCALAR_FIELDS}
+        index = state.append(self.name, color=self.color, parent=parent, **fields)
+        self.state = state
+        self.index = index
+        self._values = None
+        return index
+
     def update(self, delta_time):
+        # Bound bodies are advanced in batch by OrbitalState.update
+        if self.state is not None:
+            return
         # Update orbital position
         self.angle += (2 * np.pi / self.orbital_period) * delta_time
         if self.angle > 2 * np.pi:
             self.angle -= 2 * np.pi
-            
+
         # Update rotation
         self.rotation_angle += (2 * np.pi / self.rotation_period) * delta_time
         if self.rotation_angle > 2 * np.pi:
             self.rotation_angle -= 2 * np.pi
-            
+
     def get_position(self):
+        if self.state is not None:
+            return self.state.get_positions()[self.index].copy()
         # Calculate current position based on orbital parameters
         x = self.distance * np.cos(self.angle)
         y = self.distance * np.sin(self.angle) * np.cos(self.orbital_inclination)
         z = self.distance * np.sin(self.angle) * np.sin(self.orbital_inclination)
-        z_offset = getattr(self, 'z_offset', 0.0)
-        return np.array([x, y, z + z_offset])
-        
+        return np.array([x, y, z + self.z_offset])
+
     def get_color(self):
         return self.color
-        
+
     def get_rotation_matrix(self):
         # Create 4x4 rotation matrix for the body's own rotation
         cos_angle = np.cos(self.rotation_angle)
         sin_angle = np.sin(self.rotation_angle)
-        
+
         # Create a 4x4 matrix
         matrix = np.identity(4, dtype=np.float32)
-        
+
         # Set the rotation components
         matrix[0, 0] = cos_angle
         matrix[0, 1] = -sin_angle
         matrix[1, 0] = sin_angle
         matrix[1, 1] = cos_angle
-        
-        return matrix 
\ No newline at end of file
+
+        return matrix
@@ -0,0 +1,143 @@
+import numpy as np
+
+from .orbital_state import accumulate_levels, hierarchy_levels
+
+TWO_PI = 2 * np.pi
+
+# Real orbital eccentricities, for bodies of the default system that are
+# given non-circular orbits with OrbitElements.from_state
+PLANET_ECCENTRICITY = {
+    'Mercury': 0.2056, 'Venus': 0.0068, 'Earth': 0.0167, 'Mars': 0.0934,
+    'Jupiter': 0.0489, 'Saturn': 0.0565, 'Uranus': 0.0457, 'Neptune': 0.0113,
+    'Pluto': 0.2488, 'Moon': 0.0549,
+}
+
+# Longitude of perihelion in radians (argument of periapsis for a zero node)
+PLANET_PERIAPSIS = {
+    'Mercury': 1.3518, 'Venus': 2.2956, 'Earth': 1.7967, 'Mars': 5.8650,
+    'Jupiter': 0.2575, 'Saturn': 1.6132, 'Uranus': 2.9839, 'Neptune': 0.7849,
+    'Pluto': 3.9124, 'Moon': 5.5530,
+}
+
+
+def solve_kepler(mean_anomaly, eccentricity, tol=1e-12, max_iter=50):
+    # Eccentric anomaly E with E - e sin E = M, for arrays of any matching
+    # (broadcastable) shape. Newton iteration from E0 = M + e sin M, or pi
+    # for very eccentric orbits, converges in a few steps for e < 1.
+    M = np.mod(mean_anomaly, TWO_PI)
+    e = np.broadcast_to(eccentricity, M.shape)
+    E = np.where(e > 0.8, np.pi, M + e * np.sin(M))
+    for _ in range(max_iter):
+        delta = (E - e * np.sin(E) - M) / (1.0 - e * np.cos(E))
+        E -= delta
+        if np.max(np.abs(delta), initial=0.0) < tol:
+            break
+    return E
+
+
+class OrbitElements:
+    # Keplerian elements for every body, one array per element, giving
+    # positions and velocities at any time in closed form instead of by
+    # stepping. Positions are relative to each body's parent, like the rows
+    # of OrbitalState; *_world methods add the ancestors.
+    FIELDS = ('semi_major_axis', 'eccentricity', 'inclination', 'ascending_node',
+              'argument_of_periapsis', 'mean_anomaly_at_epoch', 'period', 'z_offset')
+
+    def __init__(self, semi_major_axis, eccentricity=0.0, inclination=0.0,
+                 ascending_node=0.0, argument_of_periapsis=0.0, mean_anomaly_at_epoch=0.0,
+                 period=1.0, z_offset=0.0, parent=-1, epoch=0.0):
+        self.semi_major_axis = np.array(semi_major_axis, dtype=np.float64, ndmin=1)
+        n = len(self.semi_major_axis)
+        for name, value in (('eccentricity', eccentricity), ('inclination', inclination),
+                            ('ascending_node', ascending_node),
+                            ('argument_of_periapsis', argument_of_periapsis),
+                            ('mean_anomaly_at_epoch', mean_anomaly_at_epoch),
+                            ('period', period), ('z_offset', z_offset)):
+            setattr(self, name, np.broadcast_to(np.asarray(value, dtype=np.float64), n).copy())
+        self.parent = np.broadcast_to(np.asarray(parent, dtype=np.int64), n).copy()
+        self.levels = hierarchy_levels(self.parent)[1]
+        self.epoch = float(epoch)
+        self._update_rotation()
+
+    @classmethod
+    def from_state(cls, state, epoch=0.0, eccentricities=None, periapsis=None):
+        # Elements matching the circular orbits of an OrbitalState at epoch.
+        # Optional name -> value dicts give selected bodies real
+        # eccentricities and periapsis directions.
+        n = len(state)
+        e = np.zeros(n)
+        w = np.zeros(n)
+        for values, out in ((eccentricities, e), (periapsis, w)):
+            if values:
+                out[:] = [values.get(name, 0.0) for name in state.names]
+        # The circular model's angle is measured from the node, like the
+        # argument of latitude, so start each orbit at the same true anomaly
+        true_anomaly = state.angle - w
+        E = 2 * np.arctan2(np.sqrt(1 - e) * np.sin(true_anomaly / 2),
+                           np.sqrt(1 + e) * np.cos(true_anomaly / 2))
+        M0 = E - e * np.sin(E)
+        return cls(state.distance, e, state.orbital_inclination, 0.0, w, M0,
+                   state.orbital_period, state.z_offset, state.parent, epoch)
+
+    def __len__(self):
+        return len(self.semi_major_axis)
+
+    def _update_rotation(self):
+        # Orbital plane to reference frame: Rz(node) Rx(i) Rz(periapsis),
+        # stored as the two in-plane basis vectors P and Q, shape (N, 3)
+        cos_o, sin_o = np.cos(self.ascending_node), np.sin(self.ascending_node)
+        cos_w, sin_w = np.cos(self.argument_of_periapsis), np.sin(self.argument_of_periapsis)
+        cos_i, sin_i = np.cos(self.inclination), np.sin(self.inclination)
+        self.P = np.stack([cos_o * cos_w - sin_o * sin_w * cos_i,
+                           sin_o * cos_w + cos_o * sin_w * cos_i,
+                           sin_w * sin_i], axis=-1)
+        self.Q = np.stack([-cos_o * sin_w - sin_o * cos_w * cos_i,
+                           -sin_o * sin_w + cos_o * cos_w * cos_i,
+                           cos_w * sin_i], axis=-1)
+
+    def mean_motion(self):
+        n = np.zeros(len(self))
+        np.divide(TWO_PI, self.period, out=n, where=self.period != 0)
+        return n
+
+    def _anomalies(self, times):
+        # Eccentric anomaly for every (time, body): shape (T, N), or (N,)
+        # for a scalar time
+        t = np.asarray(times, dtype=np.float64)
+        M = self.mean_anomaly_at_epoch + self.mean_motion() * (t[..., None] - self.epoch)
+        return solve_kepler(M, self.eccentricity)
+
+    def positions(self, times):
+        # Parent-relative positions, shape (T, N, 3) or (N, 3)
+        E = self._anomalies(times)
+        a, e = self.semi_major_axis, self.eccentricity
+        x = a * (np.cos(E) - e)
+        y = a * np.sqrt(1 - e * e) * np.sin(E)
+        out = x[..., None] * self.P + y[..., None] * self.Q
+        out[..., 2] += self.z_offset
+        return out
+
+    def velocities(self, times):
+        # Parent-relative velocities per unit of time, same shape as positions
+        E = self._anomalies(times)
+        a, e = self.semi_major_axis, self.eccentricity
+        rate = self.mean_motion() / (1 - e * np.cos(E))
+        vx = -a * np.sin(E) * rate
+        vy = a * np.sqrt(1 - e * e) * np.cos(E) * rate
+        return vx[..., None] * self.P + vy[..., None] * self.Q
+
+    def arguments_of_latitude(self, times):
+        # Angle from the node to the body (true anomaly + periapsis); equals
+        # OrbitalState.angle for circular orbits
+        E = self._anomalies(times)
+        e = self.eccentricity
+        nu = 2 * np.arctan2(np.sqrt(1 + e) * np.sin(E / 2), np.sqrt(1 - e) * np.cos(E / 2))
+        return np.mod(nu + self.argument_of_periapsis, TWO_PI)
+
+    def world_positions(self, times):
+        positions = self.positions(times)
+        return accumulate_levels(positions, self.levels, out=positions)
+
+    def world_velocities(self, times):
+        velocities = self.velocities(times)
+        return accumulate_levels(velocities, self.levels, out=velocities)
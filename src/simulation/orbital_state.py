@@ -0,0 +1,276 @@
+import numpy as np
+
+TWO_PI = 2 * np.pi
+
+
+def hierarchy_levels(parent):
+    # Group rows by depth below their root: a list of (rows, parents) index
+    # arrays for depth 1, 2, ... Each pass settles one more level of depths,
+    # so this takes as many vectorized passes as the hierarchy is deep.
+    n = len(parent)
+    depth = np.zeros(n, dtype=np.int64)
+    child = np.flatnonzero(parent >= 0)
+    if len(child) == 0:
+        return depth, []
+    while True:
+        new = depth[parent[child]] + 1
+        if np.array_equal(new, depth[child]):
+            break
+        depth[child] = new
+    order = np.argsort(depth, kind='stable')
+    bounds = np.searchsorted(depth[order], np.arange(1, depth.max() + 2))
+    levels = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        rows = order[a:b]
+        levels.append((rows, parent[rows]))
+    return depth, levels
+
+
+def accumulate_levels(local, levels, out=None):
+    # World vectors from parent-relative ones: one vectorized add per
+    # hierarchy level, shallowest first, so each parent is already in world
+    # space when its children are added. Works on (..., N, 3) arrays.
+    if out is None:
+        out = local.copy()
+    elif out is not local:
+        out[...] = local
+    for rows, parents in levels:
+        out[..., rows, :] += out[..., parents, :]
+    return out
+
+
+class OrbitalState:
+    # Structure-of-arrays store for every body in the system. Each scalar
+    # field lives in one contiguous float64 array so the whole system can be
+    # advanced with a handful of NumPy calls instead of a Python loop.
+    SCALAR_FIELDS = ('radius', 'distance', 'orbital_period', 'orbital_inclination',
+                     'rotation_period', 'mass', 'angle', 'rotation_angle', 'z_offset')
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.capacity = 0
+        self.names = []
+        self.dirty = True
+        # False while positions are driven by the N-body engine instead of
+        # the circular orbit angles
+        self.kinematic = True
+        # Cached (depth, levels) of the body hierarchy, see hierarchy_levels
+        self._hierarchy = None
+        self._buffers = {}
+        self._grow(max(int(capacity), 1))
+
+    def _grow(self, capacity):
+        # Reallocate every buffer with the new capacity, keeping active rows
+        old = self._buffers
+        new = {}
+        for field in self.SCALAR_FIELDS:
+            new[field] = np.zeros(capacity, dtype=np.float64)
+        new['color'] = np.zeros((capacity, 3), dtype=np.float32)
+        new['parent'] = np.full(capacity, -1, dtype=np.int64)
+        new['positions'] = np.zeros((capacity, 3), dtype=np.float64)
+        new['scratch'] = np.zeros(capacity, dtype=np.float64)
+        new['scratch_b'] = np.zeros(capacity, dtype=np.float64)
+        for key, buf in old.items():
+            new[key][:self.count] = buf[:self.count]
+        self._buffers = new
+        self.capacity = capacity
+        self._refresh_views()
+
+    def _refresh_views(self):
+        # Public attributes are views onto the active rows of each buffer
+        n = self.count
+        for key, buf in self._buffers.items():
+            setattr(self, key, buf[:n])
+
+    def _reserve(self, extra):
+        needed = self.count + extra
+        if needed > self.capacity:
+            self._grow(max(needed, self.capacity * 2))
+
+    def __len__(self):
+        return self.count
+
+    def _check_parents(self, parent, start, n):
+        # Keep rows topologically ordered: parents must already exist
+        parent = np.broadcast_to(np.asarray(parent, dtype=np.int64), (n,))
+        if n and (parent >= start + np.arange(n)).any():
+            raise ValueError("A body's parent must be added before the body itself")
+
+    def append(self, name, color=(1.0, 1.0, 1.0), parent=-1, **fields):
+        # Add a single body and return its row index
+        self._check_parents(parent, self.count, 1)
+        self._reserve(1)
+        index = self.count
+        self.count += 1
+        self._refresh_views()
+        for field in self.SCALAR_FIELDS:
+            getattr(self, field)[index] = fields.get(field, 0.0)
+        self.color[index] = color
+        self.parent[index] = parent
+        self.names.append(name)
+        self.dirty = True
+        self._hierarchy = None
+        return index
+
+    def extend(self, names, color=(1.0, 1.0, 1.0), parent=-1, **fields):
+        # Bulk add from arrays (or scalars broadcast to every new row) and
+        # return the slice of the new rows
+        n = len(names)
+        self._check_parents(parent, self.count, n)
+        self._reserve(n)
+        start = self.count
+        self.count += n
+        self._refresh_views()
+        rows = slice(start, self.count)
+        for field in self.SCALAR_FIELDS:
+            getattr(self, field)[rows] = fields.get(field, 0.0)
+        self.color[rows] = color
+        self.parent[rows] = parent
+        self.names.extend(names)
+        self.dirty = True
+        self._hierarchy = None
+        return rows
+
+    @property
+    def depth(self):
+        # Hierarchy depth per row: 0 for roots, 1 for their satellites, ...
+        return self.hierarchy()[0]
+
+    def hierarchy(self):
+        if self._hierarchy is None:
+            self._hierarchy = hierarchy_levels(self.parent)
+        return self._hierarchy
+
+    def children(self, index):
+        return np.flatnonzero(self.parent == index)
+
+    def depth_first_order(self, rows=None):
+        # Rows ordered so each body is followed by its whole subtree, e.g.
+        # Sun, Mercury, ..., Earth, Moon, Mars, ... for listing in the UI.
+        # With rows given, only those are ordered, and a row whose parent
+        # is not among them is treated as a root.
+        rows = np.arange(self.count) if rows is None else np.sort(np.asarray(rows, dtype=np.int64))
+        parent = self.parent[rows]
+        # Parent as a position within rows, -1 when outside the subset
+        pos = np.searchsorted(rows, parent)
+        pos = np.minimum(pos, max(len(rows) - 1, 0))
+        local_parent = np.where((parent >= 0) & (rows[pos] == parent), pos, -1)
+        order = np.argsort(local_parent, kind='stable')
+        sorted_parent = local_parent[order]
+        bounds = np.searchsorted(sorted_parent, np.arange(-1, len(rows) + 1))
+        result = []
+        stack = list(order[bounds[0]:bounds[1]][::-1])
+        while stack:
+            i = stack.pop()
+            result.append(i)
+            stack.extend(order[bounds[i + 1]:bounds[i + 2]][::-1])
+        return rows[np.array(result, dtype=np.int64)]
+
+    def invalidate(self):
+        # Call after writing to the field arrays directly
+        self.dirty = True
+
+    def _advance(self, angles, periods, delta_time):
+        # angle += 2*pi / period * dt, wrapped to [0, 2*pi). Bodies with a
+        # zero period are treated as not moving.
+        rate = self.scratch
+        rate.fill(0.0)
+        np.divide(TWO_PI * delta_time, periods, out=rate, where=periods != 0)
+        angles += rate
+        np.mod(angles, TWO_PI, out=angles)
+
+    def update(self, delta_time):
+        self._advance(self.angle, self.orbital_period, delta_time)
+        self._advance(self.rotation_angle, self.rotation_period, delta_time)
+        self.dirty = True
+        return self.get_positions()
+
+    def advance_rotation(self, delta_time):
+        self._advance(self.rotation_angle, self.rotation_period, delta_time)
+
+    def compute_positions(self):
+        # Positions relative to each body's parent, same formula as
+        # CelestialBody.get_position but for every row at once
+        pos = self.positions
+        cos_a = self.scratch
+        sin_a = self.scratch_b
+        np.cos(self.angle, out=cos_a)
+        np.sin(self.angle, out=sin_a)
+        sin_a *= self.distance
+        np.multiply(self.distance, cos_a, out=pos[:, 0])
+        np.cos(self.orbital_inclination, out=cos_a)
+        np.multiply(sin_a, cos_a, out=pos[:, 1])
+        np.sin(self.orbital_inclination, out=cos_a)
+        np.multiply(sin_a, cos_a, out=pos[:, 2])
+        pos[:, 2] += self.z_offset
+        self.dirty = False
+        return pos
+
+    def get_positions(self):
+        if self.dirty and self.kinematic:
+            self.compute_positions()
+        return self.positions
+
+    def _to_world(self, local, out=None):
+        return accumulate_levels(local, self.hierarchy()[1], out)
+
+    def world_positions(self, out=None):
+        return self._to_world(self.get_positions(), out)
+
+    def _tangents(self, speed):
+        # Direction of motion is the derivative of the orbit w.r.t. angle
+        local = np.empty((self.count, 3))
+        local[:, 0] = -np.sin(self.angle)
+        local[:, 1] = np.cos(self.angle) * np.cos(self.orbital_inclination)
+        local[:, 2] = np.cos(self.angle) * np.sin(self.orbital_inclination)
+        local *= speed[:, None]
+        return local
+
+    def kinematic_velocities(self):
+        # World-frame velocities of the circular orbit model, per unit of
+        # simulated time
+        speed = np.zeros(self.count)
+        np.divide(TWO_PI * self.distance, self.orbital_period, out=speed,
+                  where=self.orbital_period != 0)
+        return self._to_world(self._tangents(speed))
+
+    def attractors(self):
+        # The body each row orbits: its parent, or the heaviest central root
+        # body for top-level rows (-1 for that body itself)
+        roots = np.flatnonzero((self.parent < 0) & (self.distance == 0))
+        central = roots[np.argmax(self.mass[roots])] if len(roots) else -1
+        attractor = np.where(self.parent >= 0, self.parent, central)
+        attractor[np.arange(self.count) == central] = -1
+        return attractor
+
+    def hill_radii(self):
+        # Radius around each body inside which its gravity dominates that of
+        # the body it orbits, a * cbrt(m / 3M); infinite for central bodies
+        attractor = self.attractors()
+        radii = np.full(self.count, np.inf)
+        orbiting = attractor >= 0
+        central_mass = self.mass[attractor[orbiting]]
+        ratio = np.zeros(len(central_mass))
+        np.divide(self.mass[orbiting], 3 * central_mass, out=ratio, where=central_mass > 0)
+        radii[orbiting] = self.distance[orbiting] * np.cbrt(ratio)
+        return radii
+
+    def circular_velocities(self, G):
+        # World-frame velocities for circular orbits around each body's
+        # parent, or around the heaviest central root body for top-level rows
+        n = self.count
+        attractor = self.attractors()
+        central_mass = np.where(attractor >= 0, self.mass[attractor], 0.0)
+        speed = np.zeros(n)
+        orbiting = (attractor >= 0) & (self.distance > 0)
+        speed[orbiting] = np.sqrt(G * (central_mass[orbiting] + self.mass[orbiting])
+                                  / self.distance[orbiting])
+        return self._to_world(self._tangents(speed))
+
+    def set_world_positions(self, world):
+        # Store externally integrated world positions as parent-relative ones
+        local = self.positions
+        local[:] = world
+        has_parent = self.parent >= 0
+        local[has_parent] -= world[self.parent[has_parent]]
+        self.dirty = False
@@ -0,0 +1,260 @@
+import time
+import numpy as np
+
+# Scene units: distance 5.0 is Earth's orbit (1 AU), time is in years and
+# mass in solar masses, so G is chosen to give Earth a one year orbit.
+G_SCENE = 4 * np.pi ** 2 * 5.0 ** 3
+
+
+class DirectSummation:
+    # Exact O(N * M) pairwise gravity, where M is the number of bodies with
+    # non-zero mass. Massless bodies (asteroids, debris) are test particles:
+    # they feel gravity but do not pull on anything, which is what keeps
+    # thousands of small bodies cheap.
+    def __init__(self, softening=1e-3, chunk_pairs=1_000_000):
+        self.softening = softening
+        # Upper bound on target-source pairs held in memory at once
+        self.chunk_pairs = chunk_pairs
+
+    def accelerations(self, positions, masses, G, out=None, targets=None):
+        # targets optionally restricts evaluation to a subset of positions
+        target_idx = np.arange(len(positions)) if targets is None else np.asarray(targets)
+        target_pos = positions[target_idx]
+        n = len(target_pos)
+        if out is None:
+            out = np.empty((n, 3), dtype=np.float64)
+        sources = np.flatnonzero(masses > 0)
+        src_pos = positions[sources]
+        src_mass = masses[sources]
+        src_sq = np.einsum('ij,ij->i', src_pos, src_pos)
+        # Column of each body in the source list, to skip self-interaction
+        src_column = np.full(len(positions), -1)
+        src_column[sources] = np.arange(len(sources))
+        eps2 = self.softening ** 2
+        chunk = max(1, self.chunk_pairs // max(len(sources), 1))
+        for start in range(0, n, chunk):
+            end = min(start + chunk, n)
+            t = target_pos[start:end]
+            # |s - t|^2 expanded so the bulk of the work is one matrix product
+            r2 = t @ src_pos.T
+            r2 *= -2.0
+            r2 += np.einsum('ij,ij->i', t, t)[:, None]
+            r2 += src_sq
+            np.maximum(r2, 0.0, out=r2)
+            r2 += eps2
+            w = np.sqrt(r2)
+            w *= r2
+            with np.errstate(divide='ignore'):
+                np.divide(src_mass, w, out=w)
+            column = src_column[target_idx[start:end]]
+            own = np.flatnonzero(column >= 0)
+            w[own, column[own]] = 0.0
+            # sum_j w_ij (s_j - t_i) = W @ s - (sum_j w_ij) t_i
+            np.matmul(w, src_pos, out=out[start:end])
+            out[start:end] -= w.sum(axis=1)[:, None] * t
+        out *= G
+        return out
+
+
+class NBodySystem:
+    def __init__(self, positions, velocities, masses, G=G_SCENE, force_solver=None,
+                 initial_energy=None):
+        self.positions = np.array(positions, dtype=np.float64)
+        self.velocities = np.array(velocities, dtype=np.float64)
+        self.masses = np.array(masses, dtype=np.float64)
+        self.G = G
+        self.force_solver = force_solver if force_solver is not None else DirectSummation()
+        self.time = 0.0
+        # Bumped by touch() whenever positions, velocities or masses are
+        # changed from outside an integrator, so cached forces are redone
+        self.version = 0
+        # Restored systems pass the energy of the original run, which also
+        # skips the O(N^2) potential energy sum
+        self.initial_energy = self.total_energy() if initial_energy is None else initial_energy
+
+    def touch(self):
+        self.version += 1
+
+    def accelerations(self, positions=None, out=None):
+        if positions is None:
+            positions = self.positions
+        return self.force_solver.accelerations(positions, self.masses, self.G, out=out)
+
+    def kinetic_energy(self):
+        v2 = np.einsum('ij,ij->i', self.velocities, self.velocities)
+        return 0.5 * np.dot(self.masses, v2)
+
+    def potential_energy(self):
+        massive = np.flatnonzero(self.masses > 0)
+        pos = self.positions[massive]
+        m = self.masses[massive]
+        eps2 = self.force_solver.softening ** 2
+        energy = 0.0
+        for i in range(len(m) - 1):
+            d = pos[i + 1:] - pos[i]
+            r = np.sqrt(np.einsum('ij,ij->i', d, d) + eps2)
+            energy -= m[i] * np.sum(m[i + 1:] / r)
+        return self.G * energy
+
+    def total_energy(self):
+        return self.kinetic_energy() + self.potential_energy()
+
+    def energy_drift(self):
+        # Relative change in total energy since the system was created
+        if self.initial_energy == 0:
+            return 0.0
+        return float(abs((self.total_energy() - self.initial_energy) / self.initial_energy))
+
+
+class Leapfrog:
+    # Kick-drift-kick leapfrog (velocity Verlet): symplectic, second order,
+    # one force evaluation per step
+    name = 'leapfrog'
+
+    def __init__(self):
+        # Accelerations at the end of the last step, reused for the next
+        # first kick while the system has not been changed since
+        self._acc = None
+        self._system = None
+        self._version = None
+
+    def step(self, system, dt):
+        if (self._system is not system or self._version != system.version
+                or len(self._acc) != len(system.positions)):
+            self._acc = system.accelerations()
+            self._system = system
+            self._version = system.version
+        system.velocities += 0.5 * dt * self._acc
+        system.positions += dt * system.velocities
+        system.accelerations(out=self._acc)
+        system.velocities += 0.5 * dt * self._acc
+        system.time += dt
+
+
+class Yoshida4:
+    # Fourth order symplectic composition of leapfrog (Yoshida 1990),
+    # three force evaluations per step
+    name = 'yoshida4'
+    _w1 = 1.0 / (2.0 - 2.0 ** (1.0 / 3.0))
+    _w0 = -2.0 ** (1.0 / 3.0) * _w1
+    C = (_w1 / 2, (_w0 + _w1) / 2, (_w0 + _w1) / 2, _w1 / 2)
+    D = (_w1, _w0, _w1)
+
+    def __init__(self):
+        self._acc = None
+
+    def step(self, system, dt):
+        if self._acc is None or len(self._acc) != len(system.positions):
+            self._acc = np.empty_like(system.positions)
+        for i in range(3):
+            system.positions += self.C[i] * dt * system.velocities
+            system.accelerations(out=self._acc)
+            system.velocities += self.D[i] * dt * self._acc
+        system.positions += self.C[3] * dt * system.velocities
+        system.time += dt
+
+
+class RK45:
+    # Adaptive Dormand-Prince 5(4). Each call to step covers all of dt with
+    # as many internal substeps as the tolerance requires; the last accepted
+    # substep size is remembered for the next call. Calls that need more
+    # than max_substeps are counted in overruns, so a caller can loosen the
+    # tolerance or shorten its steps.
+    name = 'rk45'
+    A = (
+        (),
+        (1 / 5,),
+        (3 / 40, 9 / 40),
+        (44 / 45, -56 / 15, 32 / 9),
+        (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+        (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+        (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+    )
+    B = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0)
+    B_STAR = (5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200,
+              187 / 2100, 1 / 40)
+
+    def __init__(self, rtol=1e-8, atol=1e-10, max_substeps=1000):
+        self.rtol = rtol
+        self.atol = atol
+        self.max_substeps = max_substeps
+        self.h = None
+        self.substeps = 0
+        self.overruns = 0
+
+    def _derivative(self, system, pos, vel):
+        return vel.copy(), system.accelerations(pos)
+
+    def step(self, system, dt):
+        t = 0.0
+        h = dt if self.h is None else min(self.h, dt)
+        self.substeps = 0
+        while t < dt:
+            h = min(h, dt - t)
+            if h <= 1e-12 * dt:
+                raise RuntimeError(f"RK45 step size underflow at t={t} of dt={dt}")
+            pos0, vel0 = system.positions, system.velocities
+            kx, kv = [], []
+            for a in self.A:
+                pos = pos0.copy()
+                vel = vel0.copy()
+                for coef, dx, dv in zip(a, kx, kv):
+                    if coef:
+                        pos += h * coef * dx
+                        vel += h * coef * dv
+                dx, dv = self._derivative(system, pos, vel)
+                kx.append(dx)
+                kv.append(dv)
+            # The last stage is evaluated at the 5th order solution (FSAL)
+            new_pos, new_vel = pos, vel
+            err_pos = sum((b - bs) * k for b, bs, k in zip(self.B, self.B_STAR, kx))
+            err_vel = sum((b - bs) * k for b, bs, k in zip(self.B, self.B_STAR, kv))
+            scale_pos = self.atol + self.rtol * np.maximum(np.abs(pos0), np.abs(new_pos))
+            scale_vel = self.atol + self.rtol * np.maximum(np.abs(vel0), np.abs(new_vel))
+            err = max(np.max(np.abs(h * err_pos) / scale_pos),
+                      np.max(np.abs(h * err_vel) / scale_vel))
+            self.substeps += 1
+            if err <= 1.0:
+                system.positions[:] = new_pos
+                system.velocities[:] = new_vel
+                t += h
+            factor = 5.0 if err == 0 else min(5.0, max(0.2, 0.9 * err ** -0.2))
+            h *= factor
+        if self.substeps > self.max_substeps:
+            self.overruns += 1
+        self.h = h
+        system.time += dt
+
+
+INTEGRATORS = {
+    'leapfrog': Leapfrog,
+    'verlet': Leapfrog,
+    'yoshida4': Yoshida4,
+    'rk45': RK45,
+}
+
+
+def make_integrator(name):
+    try:
+        return INTEGRATORS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown integrator '{name}', expected one of {sorted(INTEGRATORS)}")
+
+
+def compare_integrators(build_system, dt, steps, names=('leapfrog', 'yoshida4', 'rk45')):
+    # Run each integrator on a fresh copy of the same system and report cost
+    # per step and relative energy drift, to pick the cheapest one that is
+    # accurate enough
+    results = {}
+    for name in names:
+        system = build_system()
+        integrator = make_integrator(name)
+        start = time.perf_counter()
+        for _ in range(steps):
+            integrator.step(system, dt)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            'seconds_per_step': elapsed / steps,
+            'energy_drift': system.energy_drift(),
+        }
+    return results
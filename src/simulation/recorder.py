@@ -0,0 +1,227 @@
+import json
+import os
+import queue
+import threading
+import numpy as np
+
+# One fixed-size record per body per recorded frame (40 bytes, packed);
+# `body` is the body's row index in the recorded system
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('body', '<i4'),
+    ('position', '<f4', (3,)),
+    ('velocity', '<f4', (3,)),
+    ('rotation', '<f4'),
+])
+
+HEADER_FILE = 'header.json'
+FORMAT_VERSION = 2
+
+
+def _chunk_file(index):
+    return f'chunk_{index:05d}.npy'
+
+
+class TrajectoryRecorder:
+    # Streams (time, body, xyz, velocity) records into a directory of
+    # preallocated .npy memmaps, chunk_frames frames per file. Writing a
+    # frame is a single array copy into mapped memory; finished chunks are
+    # flushed and closed on a background thread so the step loop never waits
+    # for the disk. header.json lists the chunks and their time ranges and is
+    # rewritten at every rollover, so a run that dies mid-way stays readable.
+    def __init__(self, path, names, bodies=None, every=1, chunk_frames=1024):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.bodies = (np.arange(len(names)) if bodies is None
+                       else np.asarray(bodies, dtype=np.int64))
+        self.names = [names[i] for i in self.bodies]
+        self.every = max(1, int(every))
+        self.chunk_frames = int(chunk_frames)
+        self.calls = 0
+        self.frames = 0
+        self.chunks = []
+        self.chunk = None
+        self.frame_in_chunk = 0
+        # Per-frame staging buffer, filled in place and copied into the map
+        self.frame = np.zeros(len(self.bodies), dtype=RECORD_DTYPE)
+        self.frame['body'] = self.bodies
+        self._closing = queue.Queue()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    @classmethod
+    def attach(cls, solar_system, path, **kwargs):
+        # Create a recorder for the system's bodies and register it as an
+        # update observer
+        recorder = cls(path, solar_system.state.names, **kwargs)
+        solar_system.add_observer(recorder)
+        return recorder
+
+    def __call__(self, solar_system):
+        self.calls += 1
+        if self.calls % self.every == 0:
+            self.record(solar_system.time,
+                        solar_system.state.world_positions(),
+                        solar_system.get_velocities(),
+                        solar_system.state.rotation_angle)
+
+    def record(self, time, positions, velocities, rotation=None):
+        if self.chunk is None or self.frame_in_chunk == self.chunk_frames:
+            self._next_chunk()
+        frame = self.frame
+        frame['time'] = time
+        frame['position'] = positions[self.bodies]
+        frame['velocity'] = velocities[self.bodies]
+        if rotation is not None:
+            frame['rotation'] = rotation[self.bodies]
+        n = len(frame)
+        start = self.frame_in_chunk * n
+        self.chunk[start:start + n] = frame
+        info = self.chunks[-1]
+        if self.frame_in_chunk == 0:
+            info['first_time'] = float(time)
+        info['last_time'] = float(time)
+        self.frame_in_chunk += 1
+        info['frames'] = self.frame_in_chunk
+        self.frames += 1
+
+    def _next_chunk(self):
+        if self.chunk is not None:
+            self._closing.put(self.chunk)
+        name = _chunk_file(len(self.chunks))
+        self.chunk = np.lib.format.open_memmap(
+            os.path.join(self.path, name), mode='w+', dtype=RECORD_DTYPE,
+            shape=(self.chunk_frames * len(self.bodies),))
+        self.chunks.append({'file': name, 'frames': 0,
+                            'first_time': None, 'last_time': None})
+        self.frame_in_chunk = 0
+        self._write_header()
+
+    def _flush_loop(self):
+        while True:
+            chunk = self._closing.get()
+            if chunk is None:
+                return
+            chunk.flush()
+            del chunk
+
+    def _write_header(self):
+        header = {
+            'version': FORMAT_VERSION,
+            'dtype': RECORD_DTYPE.descr,
+            'names': self.names,
+            # System row index of each column, as stored in `body`
+            'indices': self.bodies.tolist(),
+            'bodies_per_frame': len(self.bodies),
+            'chunk_frames': self.chunk_frames,
+            'frames': self.frames,
+            'chunks': self.chunks,
+        }
+        tmp = os.path.join(self.path, HEADER_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(header, f)
+        os.replace(tmp, os.path.join(self.path, HEADER_FILE))
+
+    def close(self):
+        if self.chunk is not None:
+            self._closing.put(self.chunk)
+            self.chunk = None
+        self._closing.put(None)
+        self._flusher.join()
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    # Random access to a recording. Chunks are memory-mapped read-only on
+    # first use, so slicing a few bodies or a short time window only touches
+    # the pages that hold them.
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            self.header = json.load(f)
+        self.names = self.header['names']
+        self.bodies_per_frame = self.header['bodies_per_frame']
+        self.chunks = [c for c in self.header['chunks'] if c['frames'] > 0]
+        self.chunk_starts = np.array([c['first_time'] for c in self.chunks])
+        self.chunk_ends = np.array([c['last_time'] for c in self.chunks])
+        offsets = np.cumsum([0] + [c['frames'] for c in self.chunks])
+        self.chunk_offsets = offsets
+        self._maps = {}
+
+    def __len__(self):
+        return int(self.chunk_offsets[-1])
+
+    def _frames(self, i):
+        # (frames, bodies) view of chunk i, trimmed to the frames written
+        if i not in self._maps:
+            data = np.load(os.path.join(self.path, self.chunks[i]['file']), mmap_mode='r')
+            self._maps[i] = data.reshape(-1, self.bodies_per_frame)
+        return self._maps[i][:self.chunks[i]['frames']]
+
+    def body_columns(self, bodies):
+        # Accept names, or row indices of the original system
+        if bodies is None:
+            return np.arange(self.bodies_per_frame)
+        indices = self.header['indices']
+        columns = []
+        for body in np.atleast_1d(bodies).tolist():
+            if isinstance(body, str):
+                columns.append(self.names.index(body))
+            else:
+                columns.append(indices.index(int(body)))
+        return np.array(columns, dtype=np.int64)
+
+    def locate(self, time):
+        # Index of the last frame at or before time, found by binary search
+        # over chunk start times and then over the times inside one chunk
+        i = max(int(np.searchsorted(self.chunk_starts, time, side='right')) - 1, 0)
+        times = self._frames(i)[:, 0]['time']
+        k = max(int(np.searchsorted(times, time, side='right')) - 1, 0)
+        return int(self.chunk_offsets[i]) + k
+
+    def frame(self, k):
+        # All records of global frame k
+        i = int(np.searchsorted(self.chunk_offsets, k, side='right')) - 1
+        return self._frames(i)[k - self.chunk_offsets[i]]
+
+    def time(self, k):
+        return float(self.frame(k)[0]['time'])
+
+    def times(self):
+        return np.concatenate([self._frames(i)[:, 0]['time'] for i in range(len(self.chunks))]
+                              or [np.zeros(0)])
+
+    def read(self, bodies=None, start=None, end=None):
+        # Records of the given bodies with start <= time <= end, as a
+        # (frames, bodies) structured array
+        columns = self.body_columns(bodies)
+        lo = 0 if start is None else np.searchsorted(self.chunk_ends, start, side='left')
+        hi = len(self.chunks) if end is None else np.searchsorted(self.chunk_starts, end, side='right')
+        parts = []
+        for i in range(lo, hi):
+            frames = self._frames(i)
+            times = frames[:, 0]['time']
+            a = 0 if start is None else np.searchsorted(times, start, side='left')
+            b = len(times) if end is None else np.searchsorted(times, end, side='right')
+            if b > a:
+                parts.append(frames[a:b][:, columns])
+        if not parts:
+            return np.zeros((0, len(columns)), dtype=RECORD_DTYPE)
+        return np.concatenate(parts)
+
+    def positions(self, bodies=None, start=None, end=None):
+        records = self.read(bodies, start, end)
+        return records[:, 0]['time'] if len(records) else np.zeros(0), records['position']
+
+    def velocities(self, bodies=None, start=None, end=None):
+        records = self.read(bodies, start, end)
+        return records[:, 0]['time'] if len(records) else np.zeros(0), records['velocity']
+
+    def close(self):
+        self._maps.clear()
@@ -0,0 +1,138 @@
+import numpy as np
+
+from .celestial_bodies import CelestialBody
+
+BODY_TYPES = ('star', 'planet', 'dwarf_planet', 'moon', 'asteroid', 'other')
+
+# Bodies drawn with rings, flagged once at registration instead of comparing
+# names every frame
+RINGED = ('Saturn',)
+
+
+class BodyRegistry:
+    # Lookup tables for every row of an OrbitalState. A body's ID is its row
+    # index, which is stable because rows are only ever appended. Names map
+    # to IDs through a dict, types and flags are arrays indexed by ID, and
+    # children are found through a parent-sorted index, so lookups never
+    # scan the body list.
+    def __init__(self, state):
+        self.state = state
+        self.by_name = {}
+        # Bulk row ranges whose names are indexed on the first lookup, so
+        # loading a large catalog or snapshot does not pay for the dict
+        self._pending_names = []
+        self.objects = {}
+        self._views = {}
+        self.types = np.zeros(0, dtype=np.int8)
+        self.ringed = np.zeros(0, dtype=bool)
+        self.primary_id = None
+        self._ringed_ids = None
+        self._children = None
+
+    def __len__(self):
+        return len(self.state)
+
+    def __contains__(self, name):
+        return self.id(name) is not None
+
+    def _grow(self, n):
+        if n > len(self.types):
+            capacity = max(n, 2 * len(self.types), 16)
+            for key in ('types', 'ringed'):
+                old = getattr(self, key)
+                new = np.zeros(capacity, dtype=old.dtype)
+                new[:len(old)] = old
+                setattr(self, key, new)
+
+    def type_code(self, body_type):
+        return BODY_TYPES.index(body_type)
+
+    def register(self, body, body_type):
+        # A single body object that was just bound to its row
+        self.register_rows(slice(body.index, body.index + 1), body_type)
+        self.objects[body.index] = body
+
+    def register_rows(self, rows, body_type):
+        # Rows added in bulk; body_type is a name or an array of type codes
+        start, stop = rows.start, rows.stop
+        self._grow(stop)
+        if isinstance(body_type, str):
+            self.types[start:stop] = self.type_code(body_type)
+        else:
+            self.types[start:stop] = body_type
+        names = self.state.names[start:stop]
+        self.ringed[start:stop] = np.fromiter((name in RINGED for name in names), bool, stop - start)
+        if self.primary_id is None:
+            stars = np.flatnonzero(self.types[start:stop] == self.type_code('star'))
+            if len(stars):
+                self.primary_id = start + int(stars[0])
+        if stop - start > 1000:
+            self._pending_names.append((start, stop))
+        else:
+            self._index_names(start, stop)
+        self._ringed_ids = None
+        self._children = None
+
+    def _index_names(self, start, stop):
+        # First body with a name wins, as with a linear search
+        names = self.state.names[start:stop]
+        if stop - start <= 1000:
+            for i, name in enumerate(names, start):
+                self.by_name.setdefault(name, i)
+            return
+        index = dict(zip(reversed(names), range(stop - 1, start - 1, -1)))
+        index.update(self.by_name)
+        self.by_name = index
+
+    def id(self, name):
+        if self._pending_names:
+            for start, stop in self._pending_names:
+                self._index_names(start, stop)
+            self._pending_names = []
+        return self.by_name.get(name)
+
+    def body(self, key):
+        # Body object by name or ID. Rows added in bulk get a lightweight
+        # view object the first time they are asked for.
+        index = self.id(key) if isinstance(key, str) else key
+        if index is None or not 0 <= index < len(self.state):
+            return None
+        body = self.objects.get(index)
+        if body is None:
+            body = self._views.get(index)
+            if body is None:
+                body = self._views[index] = CelestialBody.view(self.state, index)
+        return body
+
+    def of_type(self, body_type):
+        return np.flatnonzero(self.types[:len(self.state)] == self.type_code(body_type))
+
+    def is_type(self, index, body_type):
+        return self.types[index] == self.type_code(body_type)
+
+    def type_name(self, index):
+        return BODY_TYPES[self.types[index]]
+
+    @property
+    def primary(self):
+        # The central star: the first star row, or the first row at all
+        return self.body(0 if self.primary_id is None else self.primary_id)
+
+    def ringed_ids(self):
+        if self._ringed_ids is None:
+            self._ringed_ids = np.flatnonzero(self.ringed[:len(self.state)])
+        return self._ringed_ids
+
+    def children(self, index):
+        # IDs of the direct children of a row (-1 gives the roots)
+        if self._children is None:
+            parent = self.state.parent
+            order = np.argsort(parent, kind='stable')
+            self._children = (order, parent[order])
+        order, sorted_parent = self._children
+        a, b = np.searchsorted(sorted_parent, [index, index + 1])
+        return order[a:b]
+
+    def parent(self, index):
+        p = int(self.state.parent[index])
+        return None if p < 0 else p
@@ -0,0 +1,145 @@
+import threading
+import numpy as np
+
+from .recorder import RECORD_DTYPE, TrajectoryReader, TrajectoryRecorder
+
+
+class KeyframeBuffer:
+    # In-memory keyframes of a running SolarSystem, captured as an update
+    # observer every `interval` years of simulated time. Frames use the
+    # recorder's record layout, so a buffer and a recording on disk can both
+    # feed a Replay. Storage is allocated once per body count: at most
+    # `capacity` frames and at most `max_bytes` of them. When it fills up,
+    # every other keyframe is dropped and the interval doubles, so the buffer
+    # keeps spanning the whole run at a coarser spacing. The lock keeps
+    # captures from a simulation thread consistent with reads from the UI.
+    def __init__(self, interval=0.005, capacity=256, max_bytes=64 * 2**20):
+        self.base_interval = interval
+        self.interval = interval
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.names = []
+        self.frames = np.zeros((0, 0), dtype=RECORD_DTYPE)
+        self.times = np.zeros(0)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def __call__(self, solar_system):
+        if self.count and solar_system.time - self.times[self.count - 1] < self.interval:
+            return
+        state = solar_system.state
+        self.append(solar_system.time, state.world_positions(),
+                    solar_system.get_velocities(), state.rotation_angle, state.names)
+
+    def clear(self):
+        with self.lock:
+            self.count = 0
+            self.interval = self.base_interval
+
+    def append(self, time, positions, velocities, rotation, names):
+        with self.lock:
+            n = len(positions)
+            if n != self.frames.shape[1] or (self.count and time < self.times[self.count - 1]):
+                # Bodies were added or time went backwards (restored state):
+                # the old keyframes no longer describe this system
+                slots = self.max_bytes // max(n * RECORD_DTYPE.itemsize, 1)
+                slots = max(2, min(self.capacity, slots))
+                self.count = 0
+                self.interval = self.base_interval
+                self.frames = np.zeros((slots, n), dtype=RECORD_DTYPE)
+                self.frames['body'] = np.arange(n)
+                self.times = np.zeros(slots)
+                self.names = list(names)
+            if self.count == len(self.frames):
+                self._decimate()
+            frame = self.frames[self.count]
+            frame['time'] = time
+            frame['position'] = positions
+            frame['velocity'] = velocities
+            frame['rotation'] = rotation
+            self.times[self.count] = time
+            self.count += 1
+
+    def _decimate(self):
+        # Keep the even keyframes, compacted in place, so times stay sorted
+        kept = range(0, self.count, 2)
+        for k, j in enumerate(kept):
+            if k != j:
+                self.frames[k] = self.frames[j]
+                self.times[k] = self.times[j]
+        self.count = len(kept)
+        self.interval *= 2
+
+    def locate(self, time):
+        k = int(np.searchsorted(self.times[:self.count], time, side='right')) - 1
+        return max(k, 0)
+
+    def frame(self, k):
+        return self.frames[k]
+
+    def time(self, k):
+        return float(self.times[k])
+
+    def save(self, path):
+        # Write the keyframes as a recording that TrajectoryReader can open
+        with TrajectoryRecorder(path, self.names) as recorder:
+            for k in range(self.count):
+                frame = self.frames[k]
+                recorder.record(self.times[k], frame['position'], frame['velocity'],
+                                frame['rotation'])
+
+
+class Replay:
+    # Random access playback of keyframes from a KeyframeBuffer or a
+    # TrajectoryReader. Seeking is a binary search for the surrounding pair
+    # of keyframes, then cubic Hermite interpolation using the recorded
+    # velocities, so orbits stay round between sparse keyframes.
+    def __init__(self, source):
+        if isinstance(source, str):
+            source = TrajectoryReader(source)
+        self.source = source
+        self.names = source.names
+
+    def __len__(self):
+        return len(self.source)
+
+    @property
+    def start(self):
+        return self.source.time(0) if len(self.source) else 0.0
+
+    @property
+    def end(self):
+        return self.source.time(len(self.source) - 1) if len(self.source) else 0.0
+
+    def sample(self, time, out=None):
+        # (positions, rotation) at the given simulated time
+        source = self.source
+        k = source.locate(time)
+        a = source.frame(k)
+        n = len(a)
+        if out is None or out.shape != (n, 3):
+            out = np.empty((n, 3))
+        if k + 1 >= len(source) or time <= a[0]['time']:
+            out[:] = a['position']
+            return out, a['rotation'].astype(np.float64)
+        b = source.frame(k + 1)
+        t0, t1 = a[0]['time'], b[0]['time']
+        h = t1 - t0
+        s = min(max((time - t0) / h, 0.0), 1.0)
+        s2, s3 = s * s, s * s * s
+        # Hermite basis
+        h00 = 2 * s3 - 3 * s2 + 1
+        h10 = (s3 - 2 * s2 + s) * h
+        h01 = -2 * s3 + 3 * s2
+        h11 = (s3 - s2) * h
+        np.multiply(a['position'], h00, out=out)
+        out += h10 * a['velocity']
+        out += h01 * b['position']
+        out += h11 * b['velocity']
+        # Spin angles take the short way round between keyframes
+        r0 = a['rotation'].astype(np.float64)
+        delta = (b['rotation'] - r0 + np.pi) % (2 * np.pi) - np.pi
+        return out, r0 + s * delta
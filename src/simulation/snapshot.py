@@ -0,0 +1,209 @@
+import io
+import json
+import numpy as np
+
+from .barnes_hut import BarnesHut
+from .celestial_bodies import CelestialBody
+from .kepler import OrbitElements
+from .physics import DirectSummation, NBodySystem
+from .solar_system import SolarSystem
+
+# File layout: MAGIC, little-endian uint64 header length, UTF-8 JSON header,
+# then raw little-endian arrays, each starting on an ALIGN-byte boundary.
+# The header lists every array's dtype, shape and offset from the start of
+# the data section, so loading is one read plus zero-copy views.
+MAGIC = b'PSSNAP01'
+ALIGN = 64
+
+# Constructor arguments stored for each force solver
+SOLVER_PARAMS = {
+    'DirectSummation': (DirectSummation, ('softening', 'chunk_pairs')),
+    'BarnesHut': (BarnesHut, ('theta', 'softening', 'leaf_size', 'max_depth', 'group_size')),
+}
+
+
+def _pad(n):
+    return (-n) % ALIGN
+
+
+def _arrays(solar_system):
+    state = solar_system.state
+    arrays = {field: getattr(state, field) for field in state.SCALAR_FIELDS}
+    arrays['color'] = state.color
+    arrays['parent'] = state.parent
+    arrays['types'] = solar_system.registry.types[:len(state)]
+    # Names as one NUL-separated blob: splitting it is far cheaper than
+    # parsing a million JSON strings
+    arrays['names'] = np.frombuffer('\0'.join(state.names).encode('utf-8'), dtype=np.uint8)
+    physics = solar_system.physics
+    if physics is not None:
+        arrays['physics_positions'] = physics.positions
+        arrays['physics_velocities'] = physics.velocities
+        arrays['physics_masses'] = physics.masses
+        arrays['physics_carried'] = solar_system.carried
+    elements = solar_system.ephemeris
+    if elements is not None:
+        for field in elements.FIELDS:
+            arrays['ephemeris_' + field] = getattr(elements, field)
+        arrays['ephemeris_parent'] = elements.parent
+        arrays['ephemeris_rotation'] = solar_system.ephemeris_rotation
+    return arrays
+
+
+def _header(solar_system):
+    state = solar_system.state
+    header = {
+        'count': len(state),
+        'time': solar_system.time,
+        'seed': solar_system.seed,
+        'rng': solar_system.rng.bit_generator.state,
+        'kinematic': state.kinematic,
+        # Rows that have a CelestialBody object, so they are rebuilt as views
+        'bodies': [body.index for body in solar_system.bodies],
+        'physics': None,
+        'ephemeris': None,
+    }
+    if solar_system.ephemeris is not None:
+        header['ephemeris'] = {'epoch': solar_system.ephemeris.epoch,
+                               'rotation_epoch': solar_system.ephemeris_epoch}
+    physics = solar_system.physics
+    if physics is not None:
+        solver = type(physics.force_solver).__name__
+        _, params = SOLVER_PARAMS[solver]
+        header['physics'] = {
+            'G': physics.G,
+            'time': physics.time,
+            'initial_energy': physics.initial_energy,
+            'integrator': solar_system.integrator.name,
+            'rk45_h': getattr(solar_system.integrator, 'h', None),
+            'force_solver': solver,
+            'solver_params': {p: getattr(physics.force_solver, p) for p in params},
+        }
+    return header
+
+
+def save_snapshot(solar_system, path):
+    # Write the complete simulation state to path
+    with open(path, 'wb') as f:
+        write_snapshot(solar_system, f)
+
+
+def write_snapshot(solar_system, f):
+    # Same, to any binary file object (e.g. io.BytesIO)
+    write_arrays(f, MAGIC, _header(solar_system), _arrays(solar_system))
+
+
+def write_arrays(f, magic, header, arrays):
+    # The file layout described at the top, also used for catalog caches
+    offset = 0
+    layout = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        layout[name] = {'dtype': array.dtype.newbyteorder('<').str,
+                        'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes + _pad(array.nbytes)
+    header['arrays'] = layout
+    encoded = json.dumps(header).encode('utf-8')
+    prefix = len(magic) + 8 + len(encoded)
+    f.write(magic)
+    f.write(np.uint64(len(encoded)).astype('<u8').tobytes())
+    f.write(encoded)
+    f.write(b'\0' * _pad(prefix))
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array, dtype=layout[name]['dtype'])
+        f.write(memoryview(array).cast('B'))
+        f.write(b'\0' * _pad(array.nbytes))
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        return _read_header(f)[0]
+
+
+def _read_header(f):
+    return read_array_header(f, MAGIC, "PySolarSim snapshot")
+
+
+def read_array_header(f, magic, kind):
+    # (header, offset of the data section) of a file written by write_arrays
+    if f.read(len(magic)) != magic:
+        raise ValueError(f"Not a {kind}")
+    length = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+    header = json.loads(f.read(length).decode('utf-8'))
+    prefix = len(magic) + 8 + length
+    return header, prefix + _pad(prefix)
+
+
+def array_views(header, data):
+    # Zero-copy views of every array in the data section
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count,
+                                     offset=spec['offset']).reshape(spec['shape'])
+    return arrays
+
+
+def load_snapshot(path):
+    # Rebuild a SolarSystem from a snapshot written by save_snapshot
+    with open(path, 'rb') as f:
+        header, data_start = _read_header(f)
+        f.seek(data_start)
+        data = bytearray(f.seek(0, 2) - data_start)
+        f.seek(data_start)
+        f.readinto(data)
+    return _build(header, data)
+
+
+def load_snapshot_buffer(buffer):
+    # Rebuild a SolarSystem from snapshot bytes already in memory, such as
+    # a shared memory block. Every array is copied out of the buffer, so it
+    # can be shared read-only between processes.
+    view = memoryview(buffer).toreadonly()
+    length = int(np.frombuffer(view, dtype='<u8', count=1, offset=len(MAGIC))[0])
+    header, data_start = _read_header(io.BytesIO(view[:len(MAGIC) + 8 + length]))
+    return _build(header, view[data_start:])
+
+
+def _build(header, data):
+    arrays = array_views(header, data)
+    system = SolarSystem(seed=header['seed'], initialize=False)
+    system.rng.bit_generator.state = header['rng']
+    system.time = header['time']
+    state = system.state
+    n = header['count']
+    names = arrays['names'].tobytes().decode('utf-8').split('\0') if n else []
+    state.extend(names, color=arrays['color'], parent=arrays['parent'],
+                 **{field: arrays[field] for field in state.SCALAR_FIELDS})
+    state.kinematic = header['kinematic']
+    system.registry.register_rows(slice(0, n), arrays['types'])
+    for index in header['bodies']:
+        body = CelestialBody.view(state, index)
+        system.bodies.append(body)
+        system.registry.objects[index] = body
+
+    physics = header['physics']
+    if physics is not None:
+        cls, names = SOLVER_PARAMS[physics['force_solver']]
+        # Settings older versions had but this one no longer takes are dropped
+        solver_params = {p: v for p, v in physics['solver_params'].items() if p in names}
+        system.physics = NBodySystem(arrays['physics_positions'], arrays['physics_velocities'],
+                                     arrays['physics_masses'], G=physics['G'],
+                                     force_solver=cls(**solver_params),
+                                     initial_energy=physics['initial_energy'])
+        system.physics.time = physics['time']
+        system.set_carried(arrays.get('physics_carried', np.zeros(0, dtype=np.int64)))
+        system.set_integrator(physics['integrator'])
+        if physics['rk45_h'] is not None:
+            system.integrator.h = physics['rk45_h']
+        state.set_world_positions(system.physics.positions)
+    ephemeris = header['ephemeris']
+    if ephemeris is not None:
+        elements = OrbitElements(*(arrays['ephemeris_' + field] for field in OrbitElements.FIELDS),
+                                 parent=arrays['ephemeris_parent'], epoch=ephemeris['epoch'])
+        system.enable_ephemeris(elements)
+        system.ephemeris_rotation = arrays['ephemeris_rotation'].copy()
+        system.ephemeris_epoch = ephemeris['rotation_epoch']
+        system.apply_ephemeris()
+    return system
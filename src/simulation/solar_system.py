@@ -1,9 +1,82 @@
 from .celestial_bodies import CelestialBody
+from .orbital_state import OrbitalState
+from .physics import NBodySystem, G_SCENE, make_integrator
+from .kepler import OrbitElements
+from .registry import BodyRegistry
+import numpy as np
 
 class SolarSystem:
-    def __init__(self):
+    def __init__(self, seed=None, initialize=True):
+        # Every random initial angle comes from this generator, so the same
+        # seed always gives the same starting configuration
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        # Every body with a CelestialBody object, in row order; the
+        # hierarchy itself lives in state.parent
         self.bodies = []
-        self.initialize_basic_system()
+        self.state = OrbitalState()
+        # Name, type and parent indexes for every row
+        self.registry = BodyRegistry(self.state)
+        # N-body engine, None while using the circular orbit model
+        self.physics = None
+        self.integrator = None
+        # Satellites the N-body engine cannot hold (see enable_gravity),
+        # grouped by hierarchy depth
+        self.carried = None
+        self._carried_groups = []
+        # Closed-form Kepler orbits, None unless ephemeris mode is on
+        self.ephemeris = None
+        self.ephemeris_rotation = None
+        # Simulated time the ephemeris spins are measured from
+        self.ephemeris_epoch = None
+        # Slow down simulation for more realistic planet movement
+        self.slow_factor = 0.1  # Lower = slower
+        # Simulated time in years, and callbacks run after every update
+        self.time = 0.0
+        self.observers = []
+        # Optional FrameProfiler timing every update
+        self.profiler = None
+        # initialize=False gives an empty system, e.g. to restore a snapshot
+        if initialize:
+            self.initialize_basic_system()
+
+    def add_body(self, body, parent=None, body_type=None):
+        # Register a body and move its values into the shared state arrays
+        if body.random_angle:
+            body.angle = self.rng.uniform(0, 2 * np.pi)
+        body.bind(self.state, parent=-1 if parent is None else parent.index)
+        if body_type is None:
+            if parent is not None:
+                body_type = 'moon'
+            else:
+                body_type = 'star' if body.distance == 0 else 'planet'
+        self.bodies.append(body)
+        self.registry.register(body, body_type)
+        return body
+
+    def add_bodies(self, names, radius, distance, color=(0.7, 0.7, 0.7),
+                   orbital_period=1.0, orbital_inclination=0.0, rotation_period=1.0,
+                   mass=0.0, z_offset=0.0, angle=None, parent=None, body_type=None):
+        # Bulk add (e.g. asteroid belts) straight into array storage, without
+        # creating a CelestialBody per row. Returns the slice of new rows.
+        if angle is None:
+            angle = self.rng.uniform(0, 2 * np.pi, len(names))
+        # parent: a body, or row indices (one per new row) for whole
+        # satellite systems at once
+        if parent is None:
+            parent_index = -1
+        elif isinstance(parent, CelestialBody):
+            parent_index = parent.index
+        else:
+            parent_index = parent
+        rows = self.state.extend(
+            names, color=color, parent=parent_index, radius=radius, distance=distance,
+            orbital_period=orbital_period, orbital_inclination=orbital_inclination,
+            rotation_period=rotation_period, mass=mass, angle=angle, z_offset=z_offset)
+        if body_type is None:
+            body_type = 'asteroid' if parent is None else 'moon'
+        self.registry.register_rows(rows, body_type)
+        return rows
         
     def initialize_basic_system(self):
         # Create the sun with realistic parameters
@@ -12,9 +85,10 @@ class SolarSystem:
             radius=2.0,  # Scaled down for visualization
             distance=0.0,
             color=(1.0, 0.8, 0.0),  # More realistic sun color
-            rotation_period=27.0  # Earth days
+            rotation_period=27.0,  # Earth days
+            mass=1.0  # Solar masses
         )
-        self.bodies.append(sun)
+        self.add_body(sun)
         
         # Create planets with more realistic parameters
         mercury = CelestialBody(
@@ -24,7 +98,8 @@ class SolarSystem:
             color=(0.7, 0.7, 0.7),
             orbital_period=0.24,  # Earth years
             orbital_inclination=0.034,  # radians
-            rotation_period=58.6  # Earth days
+            rotation_period=58.6,  # Earth days
+            mass=1.66e-7
         )
         
         venus = CelestialBody(
@@ -34,7 +109,8 @@ class SolarSystem:
             color=(0.9, 0.7, 0.5),
             orbital_period=0.62,
             orbital_inclination=0.003,  # radians
-            rotation_period=243.0  # Earth days (retrograde)
+            rotation_period=243.0,  # Earth days (retrograde)
+            mass=2.45e-6
         )
         
         earth = CelestialBody(
@@ -44,7 +120,8 @@ class SolarSystem:
             color=(0.2, 0.4, 0.8),
             orbital_period=1.0,
             orbital_inclination=0.0,
-            rotation_period=1.0  # Earth days
+            rotation_period=1.0,  # Earth days
+            mass=3.0e-6
         )
         
         mars = CelestialBody(
@@ -54,7 +131,8 @@ class SolarSystem:
             color=(0.8, 0.3, 0.2),
             orbital_period=1.88,
             orbital_inclination=0.032,  # radians
-            rotation_period=1.03  # Earth days
+            rotation_period=1.03,  # Earth days
+            mass=3.23e-7
         )
         
         jupiter = CelestialBody(
@@ -64,7 +142,8 @@ class SolarSystem:
             color=(0.9, 0.8, 0.6),
             orbital_period=11.86,
             orbital_inclination=0.022,  # radians
-            rotation_period=0.41  # Earth days
+            rotation_period=0.41,  # Earth days
+            mass=9.55e-4
         )
         
         saturn = CelestialBody(
@@ -74,7 +153,8 @@ class SolarSystem:
             color=(0.9, 0.8, 0.5),
             orbital_period=29.46,
             orbital_inclination=0.043,  # radians
-            rotation_period=0.45  # Earth days
+            rotation_period=0.45,  # Earth days
+            mass=2.86e-4
         )
         
         uranus = CelestialBody(
@@ -84,7 +164,8 @@ class SolarSystem:
             color=(0.6, 0.8, 0.9),
             orbital_period=84.01,
             orbital_inclination=0.013,  # radians
-            rotation_period=0.72  # Earth days
+            rotation_period=0.72,  # Earth days
+            mass=4.37e-5
         )
         
         neptune = CelestialBody(
@@ -94,7 +175,8 @@ class SolarSystem:
             color=(0.3, 0.5, 0.9),
             orbital_period=164.8,
             orbital_inclination=0.030,  # radians
-            rotation_period=0.67  # Earth days
+            rotation_period=0.67,  # Earth days
+            mass=5.15e-5
         )
         
         pluto = CelestialBody(
@@ -104,16 +186,16 @@ class SolarSystem:
             color=(0.8, 0.8, 0.7),
             orbital_period=248.0,
             orbital_inclination=0.157,  # radians
-            rotation_period=6.39  # Earth days
+            rotation_period=6.39,  # Earth days
+            mass=6.6e-9
         )
         
         z_offsets = [0.0, 0.2, -0.2, 0.4, -0.4, 0.6, -0.6, 0.8, -0.8]  # For 8 planets + Pluto
         planet_list = [mercury, venus, earth, mars, jupiter, saturn, uranus, neptune, pluto]
         for i, planet in enumerate(planet_list):
             planet.z_offset = z_offsets[i]
-        self.bodies.extend(planet_list)
+            self.add_body(planet, body_type='dwarf_planet' if planet is pluto else None)
         # Add the Moon as a satellite of Earth
-        self.satellites = {"Earth": []}
         moon = CelestialBody(
             name="Moon",
             radius=0.18,
@@ -121,22 +203,191 @@ class SolarSystem:
             color=(0.8, 0.8, 0.85),
             orbital_period=0.0748,  # Earth years (~27.3 days)
             orbital_inclination=0.089,  # radians (~5.1 deg)
-            rotation_period=27.3  # Synchronous rotation
+            rotation_period=27.3,  # Synchronous rotation
+            mass=3.69e-8
         )
-        self.satellites["Earth"].append(moon)
+        self.add_body(moon, parent=earth)
         
+    def enable_gravity(self, integrator='leapfrog', force_solver=None, G=G_SCENE):
+        # Switch from circular orbits to mutual gravity, starting from the
+        # current positions with circular orbit velocities
+        state = self.state
+        positions = state.world_positions()
+        velocities = state.circular_velocities(G)
+        self.disable_ephemeris()
+        # A satellite outside its parent's Hill sphere is pulled away by the
+        # body its parent orbits; at the scene masses that is the Moon (0.9
+        # from Earth, Hill radius 0.05). Such rows keep their circular orbit
+        # around the parent's integrated position and are massless in the
+        # engine, so they do not disturb the others.
+        hill = state.hill_radii()
+        parent = state.parent
+        carried = np.flatnonzero((parent >= 0) & (state.distance > hill[np.maximum(parent, 0)]))
+        masses = state.mass.copy()
+        masses[carried] = 0.0
+        self.physics = NBodySystem(positions, velocities, masses,
+                                   G=G, force_solver=force_solver)
+        self.set_carried(carried)
+        self.set_integrator(integrator)
+        state.kinematic = False
+        state.set_world_positions(self.physics.positions)
+        return self.physics
+
+    def set_carried(self, rows):
+        self.carried = np.sort(np.asarray(rows, dtype=np.int64))
+        # Shallowest first, so a parent is placed before its own satellites
+        depth = self.state.hierarchy()[0][self.carried]
+        self._carried_groups = [(self.carried[depth == d], np.flatnonzero(depth == d))
+                                for d in np.unique(depth)]
+        self._carry(0.0)
+
+    def _carry(self, step):
+        # Move carried satellites along their circular orbits relative to
+        # the parents' integrated positions and velocities
+        rows = self.carried
+        if rows is None or len(rows) == 0:
+            return
+        state = self.state
+        period = state.orbital_period[rows]
+        rate = np.zeros(len(rows))
+        np.divide(2 * np.pi, period, out=rate, where=period != 0)
+        angle = np.mod(state.angle[rows] + rate * step, 2 * np.pi)
+        state.angle[rows] = angle
+        distance = state.distance[rows]
+        inclination = state.orbital_inclination[rows]
+        sin_a, cos_a = np.sin(angle), np.cos(angle)
+        local = np.stack([distance * cos_a,
+                          distance * sin_a * np.cos(inclination),
+                          distance * sin_a * np.sin(inclination) + state.z_offset[rows]], axis=1)
+        speed = rate * distance
+        velocity = np.stack([-sin_a, cos_a * np.cos(inclination),
+                             cos_a * np.sin(inclination)], axis=1) * speed[:, None]
+        positions, velocities = self.physics.positions, self.physics.velocities
+        for group, k in self._carried_groups:
+            parents = state.parent[group]
+            positions[group] = positions[parents] + local[k]
+            velocities[group] = velocities[parents] + velocity[k]
+
+    def enable_ephemeris(self, elements=None, eccentricities=None, periapsis=None):
+        # Evaluate positions in closed form from Keplerian elements, so any
+        # time can be reached in one step (see set_time). By default the
+        # elements reproduce the current circular orbits.
+        self.disable_gravity()
+        if elements is None:
+            elements = OrbitElements.from_state(self.state, self.time, eccentricities, periapsis)
+        self.ephemeris = elements
+        self.ephemeris_rotation = self.state.rotation_angle.copy()
+        self.ephemeris_epoch = self.time
+        self.state.kinematic = False
+        self.apply_ephemeris()
+        return elements
+
+    def disable_ephemeris(self):
+        self.ephemeris = None
+        self.ephemeris_rotation = None
+        self.ephemeris_epoch = None
+        self.state.kinematic = True
+        self.state.invalidate()
+
+    def apply_ephemeris(self):
+        # Write positions, orbit angles and spins at self.time into the state
+        state = self.state
+        state.positions[:] = self.ephemeris.positions(self.time)
+        state.angle[:] = self.ephemeris.arguments_of_latitude(self.time)
+        spin = np.zeros(len(state))
+        np.divide(2 * np.pi * (self.time - self.ephemeris_epoch), state.rotation_period,
+                  out=spin, where=state.rotation_period != 0)
+        np.mod(self.ephemeris_rotation + spin, 2 * np.pi, out=state.rotation_angle)
+        state.dirty = False
+
+    def set_time(self, time):
+        # Jump straight to a simulated time (years); ephemeris mode only
+        if self.ephemeris is None:
+            raise ValueError("set_time needs ephemeris mode, other modes must be stepped")
+        self.time = time
+        self.apply_ephemeris()
+        return self.state.positions
+
+    def set_integrator(self, name):
+        self.integrator = make_integrator(name)
+
+    def disable_gravity(self):
+        if self.physics is None:
+            return
+        self.physics = None
+        self.integrator = None
+        self.carried = None
+        self._carried_groups = []
+        self.state.kinematic = True
+        self.state.invalidate()
+
+    def energy_drift(self):
+        return self.physics.energy_drift() if self.physics is not None else 0.0
+
+    def add_observer(self, callback):
+        # callback(solar_system) is called after every update, e.g. recorders
+        self.observers.append(callback)
+
+    def remove_observer(self, callback):
+        self.observers.remove(callback)
+
     def update(self, delta_time):
-        # Slow down simulation for more realistic planet movement
-        slow_factor = 0.1  # Lower = slower
-        for body in self.bodies:
-            body.update(delta_time * slow_factor)
-        # Update satellites
-        for planet, moons in getattr(self, 'satellites', {}).items():
-            for moon in moons:
-                moon.update(delta_time * slow_factor)
+        if self.profiler is not None:
+            with self.profiler.stage('update'):
+                return self._update(delta_time)
+        return self._update(delta_time)
+
+    def _update(self, delta_time):
+        step = delta_time * self.slow_factor
+        self.time += step
+        if self.physics is not None:
+            self.integrator.step(self.physics, step)
+            self._carry(step)
+            self.state.advance_rotation(step)
+            self.state.set_world_positions(self.physics.positions)
+            positions = self.state.positions
+        elif self.ephemeris is not None:
+            # Closed form at the new time, no accumulated angle
+            self.apply_ephemeris()
+            positions = self.state.positions
+        else:
+            # Advance every body (planets, satellites, bulk rows) in one batch
+            positions = self.state.update(step)
+        for observer in self.observers:
+            observer(self)
+        return positions
+
+    def get_velocities(self):
+        # (N, 3) world-frame velocities per year of simulated time
+        if self.physics is not None:
+            return self.physics.velocities
+        if self.ephemeris is not None:
+            return self.ephemeris.world_velocities(self.time)
+        return self.state.kinematic_velocities()
+
+    def get_positions(self):
+        # (N, 3) positions of every body relative to its parent
+        return self.state.get_positions()
             
     def get_bodies(self):
         return self.bodies
 
+    def get_body(self, key):
+        # Body by name or ID, or None
+        return self.registry.body(key)
+
+    def get_parent(self, body):
+        parent = self.registry.parent(body.index)
+        return None if parent is None else self.registry.body(parent)
+
+    def get_children(self, body):
+        return [self.registry.body(i) for i in self.registry.children(body.index)]
+
     def get_satellites(self, planet_name):
-        return self.satellites.get(planet_name, []) 
\ No newline at end of file
+        planet = self.registry.id(planet_name)
+        return [] if planet is None else [self.registry.body(i) for i in self.registry.children(planet)]
+
+    def hierarchy_order(self):
+        # Bodies with each one followed by its satellites, at any depth
+        objects = self.registry.objects
+        return [objects[i] for i in self.state.depth_first_order(list(objects))]
@@ -0,0 +1,126 @@
+import contextlib
+import threading
+import time
+import numpy as np
+
+
+class FixedStepper:
+    # Advances a SolarSystem in fixed steps regardless of how often it is
+    # called. Elapsed time (already multiplied by the simulation speed) goes
+    # into an accumulator that is drained one step at a time; what is left
+    # over becomes the interpolation factor between the last two states.
+    def __init__(self, solar_system, step=0.016, max_steps_per_call=600):
+        self.solar_system = solar_system
+        self.step = step
+        self.max_steps_per_call = max_steps_per_call
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.time = 0.0
+        self.steps_taken = 0
+        self.reset()
+
+    def reset(self):
+        # Drop interpolation history, e.g. after bodies were added or the
+        # state was restored
+        current = self.solar_system.state.world_positions()
+        self.previous = current.copy()
+        self.current = current
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+    def advance(self, elapsed):
+        self.accumulator += elapsed
+        steps = 0
+        while self.accumulator >= self.step and steps < self.max_steps_per_call:
+            self.solar_system.update(self.step)
+            self.previous, self.current = self.current, self.previous
+            if len(self.current) != len(self.solar_system.state):
+                self.reset()
+            else:
+                self.current[:] = self.solar_system.state.world_positions()
+            self.accumulator -= self.step
+            self.time += self.step
+            steps += 1
+        if steps == self.max_steps_per_call:
+            # Too far behind: drop the backlog instead of spiralling
+            self.accumulator = min(self.accumulator, self.step)
+        self.alpha = self.accumulator / self.step
+        self.steps_taken += steps
+        return steps
+
+    def positions(self, out=None, alpha=None):
+        # World positions interpolated between the last two fixed steps
+        if alpha is None:
+            alpha = self.alpha
+        if out is None or out.shape != self.current.shape:
+            out = np.empty_like(self.current)
+        np.subtract(self.current, self.previous, out=out)
+        out *= alpha
+        out += self.previous
+        return out
+
+
+class SimulationWorker(threading.Thread):
+    # Runs a FixedStepper on a background thread and publishes snapshots of
+    # world positions and spin angles for the renderer, so slow frames do
+    # not slow down simulated time and heavy steps do not block the UI.
+    def __init__(self, solar_system, step=0.016, speed=1.0, max_steps_per_call=600):
+        super().__init__(daemon=True)
+        self.stepper = FixedStepper(solar_system, step, max_steps_per_call)
+        self.speed = speed
+        self.running = True
+        self.lock = threading.Lock()
+        # Held while stepping, so other threads can change the system
+        # (e.g. add bodies) between steps
+        self.step_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._publish()
+
+    def _publish(self):
+        stepper = self.stepper
+        snapshot = (stepper.previous.copy(), stepper.current.copy(),
+                    stepper.solar_system.state.rotation_angle.copy(),
+                    stepper.alpha, time.perf_counter())
+        with self.lock:
+            self.snapshot = snapshot
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            with self.step_lock:
+                stepped = self.running and self.stepper.advance(elapsed * self.speed)
+                if stepped:
+                    self._publish()
+            # Sleep roughly until the next step is due
+            delay = self.stepper.step / max(self.speed, 1e-6) if self.running else 0.01
+            self._stop_event.wait(min(delay, 0.01))
+
+    @contextlib.contextmanager
+    def paused(self):
+        # Hold off stepping while the caller changes the system, then restart
+        # interpolation from its new state and publish it straight away
+        with self.step_lock:
+            yield
+            self.stepper.reset()
+            self._publish()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def latest(self, out=None):
+        # Interpolated positions and spin angles of the newest snapshot,
+        # extrapolating alpha by the wall time since it was published
+        with self.lock:
+            previous, current, rotation, alpha, published = self.snapshot
+        if self.running:
+            alpha += (time.perf_counter() - published) * self.speed / self.stepper.step
+        alpha = min(alpha, 1.0)
+        if out is None or out.shape != current.shape:
+            out = np.empty_like(current)
+        np.subtract(current, previous, out=out)
+        out *= alpha
+        out += previous
+        return out, rotation
@@ -0,0 +1,221 @@
+import csv
+import io
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+
+from .kepler import PLANET_ECCENTRICITY, PLANET_PERIAPSIS
+from .snapshot import load_snapshot_buffer, write_snapshot
+
+# Summary columns written for every run
+METRICS = ('bodies', 'steps', 'final_time', 'energy_drift', 'max_radius_change',
+           'escaped', 'seconds')
+
+
+def parameter_grid(grid):
+    # Every combination of a {"Earth.distance": [...], "*.mass": [...]} grid,
+    # as a list of {key: value} dicts in a fixed order. "Name.field" sets the
+    # field of one body; "*.field" multiplies it for every body.
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def apply_parameters(system, params):
+    state = system.state
+    for key, value in params.items():
+        target, _, field = key.rpartition('.')
+        if field not in state.SCALAR_FIELDS:
+            raise ValueError(f"Unknown field {field!r} in {key!r}")
+        column = getattr(state, field)
+        if target == '*':
+            column *= value
+        else:
+            row = system.registry.id(target)
+            if row is None:
+                raise KeyError(f"No body named {target!r}")
+            column[row] = value
+    state.invalidate()
+    if system.physics is not None:
+        # The N-body engine keeps its own copy of the masses, with carried
+        # satellites massless
+        system.physics.masses[:] = state.mass
+        system.physics.masses[system.carried] = 0.0
+        system.physics.touch()
+
+
+def _radii(system):
+    # Distance of every body from its parent (the origin for roots)
+    world = system.state.world_positions()
+    parent = system.state.parent
+    relative = world.copy()
+    has_parent = parent >= 0
+    relative[has_parent] -= world[parent[has_parent]]
+    return np.sqrt(np.einsum('ij,ij->i', relative, relative))
+
+
+def simulate(system, mode='circular', duration=10.0, step=0.016, sample_every=10,
+             escape_factor=2.0):
+    # Run one variant and summarise how far its orbits wandered. mode is
+    # 'circular', 'kepler' or an N-body integrator name. Radii are sampled
+    # every sample_every steps; a body has escaped when it ends up further
+    # than escape_factor times the widest starting orbit.
+    if mode == 'kepler':
+        system.enable_ephemeris(eccentricities=PLANET_ECCENTRICITY, periapsis=PLANET_PERIAPSIS)
+    elif mode != 'circular':
+        system.enable_gravity(mode)
+    start_radii = _radii(system)
+    orbiting = start_radii > 0
+    change = 0.0
+    steps = int(round(duration / step))
+    for i in range(1, steps + 1):
+        system.update(step)
+        if i % sample_every == 0 or i == steps:
+            radii = _radii(system)
+            if orbiting.any():
+                ratio = np.abs(radii[orbiting] - start_radii[orbiting]) / start_radii[orbiting]
+                change = max(change, float(ratio.max()))
+    escaped = int(np.count_nonzero(radii > escape_factor * start_radii.max())) if steps else 0
+    return {'bodies': len(system.state), 'steps': steps, 'final_time': system.time,
+            'energy_drift': system.energy_drift(), 'max_radius_change': change,
+            'escaped': escaped}
+
+
+def _attach(name):
+    # Open the base snapshot block; the parent owns and unlinks it
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument. Pool workers share the
+        # parent's resource tracker, which already knows the block.
+        return shared_memory.SharedMemory(name=name)
+
+
+_base = None
+
+
+def _init_worker(name):
+    global _base
+    _base = _attach(name)
+
+
+def _run(run_id, params, options):
+    start = time.perf_counter()
+    system = load_snapshot_buffer(_base.buf)
+    apply_parameters(system, params)
+    metrics = simulate(system, **options)
+    metrics['seconds'] = time.perf_counter() - start
+    return run_id, metrics
+
+
+def read_results(path):
+    # Rows of a results table as dicts, keeping the latest row per run
+    rows = {}
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            rows[int(row['run_id'])] = row
+    return [rows[run_id] for run_id in sorted(rows)]
+
+
+class Sweep:
+    # Runs variants of one base system across a process pool. The base is
+    # written once as a snapshot into shared memory, so workers rebuild it
+    # from there instead of receiving a pickled copy per run. Each finished
+    # run is appended to a CSV table straight away; running the same sweep
+    # again skips the runs already marked ok and retries failed or missing
+    # ones.
+    def __init__(self, base, runs, path, mode='circular', duration=10.0, step=0.016,
+                 sample_every=10, escape_factor=2.0, workers=None):
+        if base.physics is not None or base.ephemeris is not None:
+            raise ValueError("The base system must use circular orbits; choose how "
+                             "variants run with mode")
+        self.base = base
+        # runs: a grid dict (see parameter_grid) or a list of parameter dicts
+        self.runs = parameter_grid(runs) if isinstance(runs, dict) else list(runs)
+        self.path = path
+        self.options = {'mode': mode, 'duration': duration, 'step': step,
+                        'sample_every': sample_every, 'escape_factor': escape_factor}
+        self.workers = workers
+        self.keys = []
+        for params in self.runs:
+            for key in params:
+                if key not in self.keys:
+                    self.keys.append(key)
+        self.columns = ['run_id', 'status', 'error'] + self.keys + list(METRICS)
+        # Fail before starting any process on a typo in the grid
+        names = set(base.state.names)
+        for key in self.keys:
+            target, _, field = key.rpartition('.')
+            if field not in base.state.SCALAR_FIELDS:
+                raise ValueError(f"Unknown field {field!r} in {key!r}")
+            if target != '*' and target not in names:
+                raise KeyError(f"No body named {target!r}")
+
+    def pending(self):
+        done = {int(row['run_id']) for row in read_results(self.path) if row['status'] == 'ok'}
+        return [run_id for run_id in range(len(self.runs)) if run_id not in done]
+
+    def _open_table(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, newline='') as f:
+                header = next(csv.reader(f))
+            if header != self.columns:
+                raise ValueError(f"{self.path} holds a different sweep (columns {header})")
+            f = open(self.path, 'a', newline='')
+            return f, csv.DictWriter(f, self.columns)
+        f = open(self.path, 'w', newline='')
+        writer = csv.DictWriter(f, self.columns)
+        writer.writeheader()
+        return f, writer
+
+    def run(self, progress=None):
+        # Run every pending variant; progress(run_id, status) is called as
+        # runs finish. Returns the whole table from read_results.
+        pending = self.pending()
+        if not pending:
+            return read_results(self.path)
+        buffer = io.BytesIO()
+        write_snapshot(self.base, buffer)
+        data = buffer.getbuffer()
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        table, writer = self._open_table()
+        try:
+            block.buf[:len(data)] = data
+            del data
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                     initargs=(block.name,)) as pool:
+                futures = {pool.submit(_run, run_id, self.runs[run_id], self.options): run_id
+                           for run_id in pending}
+                for future in as_completed(futures):
+                    run_id = futures[future]
+                    row = {'run_id': run_id, **self.runs[run_id]}
+                    try:
+                        _, metrics = future.result()
+                        row.update(metrics, status='ok', error='')
+                    except BrokenProcessPool as e:
+                        row.update(status='failed', error=f"worker died: {e}")
+                    except Exception as e:
+                        row.update(status='failed', error=f"{type(e).__name__}: {e}")
+                    writer.writerow(row)
+                    table.flush()
+                    if progress is not None:
+                        progress(run_id, row['status'])
+        finally:
+            table.close()
+            block.close()
+            block.unlink()
+        return read_results(self.path)
+
+    def results(self):
+        # The table as columns: parameter and metric arrays of ok runs
+        rows = [row for row in read_results(self.path) if row['status'] == 'ok']
+        columns = {'run_id': np.array([int(row['run_id']) for row in rows], dtype=np.int64)}
+        for key in self.keys + list(METRICS):
+            columns[key] = np.array([float(row[key]) for row in rows])
+        return columns
+
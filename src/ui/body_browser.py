@@ -0,0 +1,216 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QComboBox,
+                             QListView, QLabel)
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer, pyqtSignal
+import math
+import numpy as np
+
+from src.simulation.registry import BODY_TYPES
+
+INFO_TEMPLATE = ("Name: {name}\n"
+                 "Type: {type}\n"
+                 "Radius: {radius:.2f}\n"
+                 "Distance: {distance:.2f}{parent}\n"
+                 "Orbital Period: {period:.2f} years\n"
+                 "Rotation Period: {rotation:.2f} days\n"
+                 "Orbital Inclination: {inclination:.2f}°")
+
+
+class BodyListModel(QAbstractListModel):
+    # Body IDs in display order, with names looked up only for the rows the
+    # view actually paints. Rows are handed to the view in batches through
+    # canFetchMore/fetchMore, so a million-body catalog opens instantly.
+    BATCH = 1000
+
+    def __init__(self, solar_system, parent=None):
+        super().__init__(parent)
+        self.solar_system = solar_system
+        self.order = np.zeros(0, dtype=np.int64)
+        self.rows = self.order
+        self.loaded = 0
+        self.text = ''
+        self.body_type = None
+        self._lower_names = None
+        self.refresh()
+
+    def refresh(self):
+        # Rebuild after bodies were added: bodies with objects in hierarchy
+        # order first, then bulk rows in row order
+        state = self.solar_system.state
+        objects = np.array(sorted(self.solar_system.registry.objects), dtype=np.int64)
+        tree = state.depth_first_order(objects)
+        rest = np.ones(len(state), dtype=bool)
+        rest[objects] = False
+        self.order = np.concatenate([tree, np.flatnonzero(rest)])
+        self._lower_names = None
+        self.set_filter(self.text, self.body_type, narrow=False)
+
+    def lower_names(self):
+        if self._lower_names is None:
+            self._lower_names = [name.lower() for name in self.solar_system.state.names]
+        return self._lower_names
+
+    def set_filter(self, text, body_type=None, narrow=True):
+        # Incremental search: typing more characters only re-checks the
+        # rows that matched the shorter text
+        text = text.strip().lower()
+        if narrow and body_type == self.body_type and text.startswith(self.text):
+            candidates = self.rows
+        else:
+            candidates = self.order
+            if body_type is not None:
+                registry = self.solar_system.registry
+                candidates = candidates[registry.types[candidates] == registry.type_code(body_type)]
+        if text and not (candidates is self.rows and text == self.text):
+            names = self.lower_names()
+            candidates = np.array([i for i in candidates.tolist() if text in names[i]], dtype=np.int64)
+        self.beginResetModel()
+        self.text = text
+        self.body_type = body_type
+        self.rows = candidates
+        self.loaded = min(self.BATCH, len(candidates))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.loaded < len(self.rows)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(self.BATCH, len(self.rows) - self.loaded)
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        body_id = int(self.rows[index.row()])
+        if role == Qt.ItemDataRole.DisplayRole:
+            # Indent satellites under their parent
+            depth = int(self.solar_system.state.depth[body_id])
+            return '    ' * depth + self.solar_system.state.names[body_id]
+        if role == Qt.ItemDataRole.UserRole:
+            return body_id
+        return None
+
+    def position_of(self, body_id):
+        # Model row of a body, loading batches up to it; -1 if filtered out
+        found = np.flatnonzero(self.rows == body_id)
+        if len(found) == 0:
+            return -1
+        position = int(found[0])
+        if position >= self.loaded:
+            self.beginInsertRows(QModelIndex(), self.loaded, position)
+            self.loaded = position + 1
+            self.endInsertRows()
+        return position
+
+
+class BodyBrowser(QWidget):
+    # Search box, type filter and a virtualized list of bodies
+    bodySelected = pyqtSignal(int)
+
+    def __init__(self, solar_system, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        filter_layout = QHBoxLayout()
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search bodies...")
+        self.search.setClearButtonEnabled(True)
+        filter_layout.addWidget(self.search, stretch=2)
+        self.type_combo = QComboBox()
+        self.type_combo.addItem("All types", None)
+        for body_type in BODY_TYPES:
+            self.type_combo.addItem(body_type.replace('_', ' ').capitalize(), body_type)
+        filter_layout.addWidget(self.type_combo, stretch=1)
+        layout.addLayout(filter_layout)
+        self.model = BodyListModel(solar_system, self)
+        self.view = QListView()
+        # Every row has the same height, so the view never measures them all
+        self.view.setUniformItemSizes(True)
+        self.view.setModel(self.model)
+        self.view.setMaximumHeight(180)
+        layout.addWidget(self.view)
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+        # Filter after a short pause in typing, not on every keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.search.textChanged.connect(self.filter_timer.start)
+        self.type_combo.currentIndexChanged.connect(self.apply_filter)
+        self.view.selectionModel().currentChanged.connect(self.on_current_changed)
+        self.update_count()
+
+    def apply_filter(self):
+        self.model.set_filter(self.search.text(), self.type_combo.currentData())
+        self.update_count()
+
+    def refresh(self):
+        self.model.refresh()
+        self.update_count()
+
+    def update_count(self):
+        total = len(self.model.order)
+        shown = len(self.model.rows)
+        self.count_label.setText(f"{shown} of {total} bodies" if shown != total else f"{total} bodies")
+
+    def on_current_changed(self, current, previous):
+        body_id = self.model.data(current, Qt.ItemDataRole.UserRole)
+        if body_id is not None:
+            self.bodySelected.emit(body_id)
+
+    def select(self, body_id):
+        # Highlight a body chosen elsewhere (e.g. by clicking the viewport)
+        position = self.model.position_of(body_id)
+        if position < 0:
+            # Filtered out: clear the filter so the body can be shown
+            self.search.blockSignals(True)
+            self.search.clear()
+            self.search.blockSignals(False)
+            self.type_combo.blockSignals(True)
+            self.type_combo.setCurrentIndex(0)
+            self.type_combo.blockSignals(False)
+            self.apply_filter()
+            position = self.model.position_of(body_id)
+        index = self.model.index(position)
+        self.view.setCurrentIndex(index)
+        self.view.scrollTo(index)
+
+
+class BodyInfoPanel(QLabel):
+    # Info text per body, formatted once and cached by ID
+    def __init__(self, solar_system, parent=None):
+        super().__init__("Select a body to view its information", parent)
+        self.solar_system = solar_system
+        self.setWordWrap(True)
+        self.cache = {}
+
+    def invalidate(self):
+        # Call after editing body parameters
+        self.cache.clear()
+
+    def show_body(self, body_id):
+        text = self.cache.get(body_id)
+        if text is None:
+            text = self.cache[body_id] = self.format(body_id)
+        self.setText(text)
+
+    def format(self, body_id):
+        state = self.solar_system.state
+        registry = self.solar_system.registry
+        parent = registry.parent(body_id)
+        return INFO_TEMPLATE.format(
+            name=state.names[body_id],
+            type=registry.type_name(body_id).replace('_', ' '),
+            radius=state.radius[body_id],
+            distance=state.distance[body_id],
+            parent='' if parent is None else f" (from {state.names[parent]})",
+            period=state.orbital_period[body_id],
+            rotation=state.rotation_period[body_id],
+            inclination=math.degrees(state.orbital_inclination[body_id]))
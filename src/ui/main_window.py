@@ -1,25 +1,49 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QPushButton, QLabel, QSlider, QGroupBox, QSpinBox,
-                            QComboBox, QCheckBox)
+                            QComboBox, QCheckBox, QFileDialog)
 from PyQt6.QtCore import Qt, QTimer
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from PyQt6.QtOpenGLWidgets import QOpenGLWidget
 from src.simulation.solar_system import SolarSystem
+from src.simulation.stepper import FixedStepper, SimulationWorker
+from src.simulation.replay import KeyframeBuffer, Replay
+from src.simulation.catalog import load_catalog
+from src.graphics.meshes import MeshCache
+from src.graphics.renderer import InstancedSphereRenderer, build_instances
+from src.graphics.lod import LODSettings, camera_eye, pixel_scale, projected_radius
+from src.graphics.orbits import OrbitCache
+from src.graphics.starfield import Starfield
+from src.graphics.picking import BodyPicker, ray_from_screen
+from src.graphics.culling import CullStats, frustum_planes, spheres_visible
+from src.graphics.transforms import ModelMatrices
+from src.ui.body_browser import BodyBrowser, BodyInfoPanel
+from src.profiling import FrameProfiler
+import contextlib
 import math
+import time
 import numpy as np
 from PyQt6.QtGui import QMouseEvent, QWheelEvent, QKeyEvent
-import random
 
 class GLWidget(QOpenGLWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, seed=None):
         super().__init__(parent)
         self.setMinimumSize(800, 600)
-        self.solar_system = SolarSystem()
+        self.solar_system = SolarSystem(seed=seed)
         self.simulation_speed = 1.0
         self.is_running = True
         self.selected_body = None
         
+        # Fixed-step simulation, decoupled from the render timer
+        self.stepper = FixedStepper(self.solar_system, step=0.016)
+        self.sim_worker = None
+        self.last_frame_time = time.perf_counter()
+        
+        # Keyframes for scrubbing back in time, captured only when enabled
+        self.keyframes = KeyframeBuffer()
+        self.replay = None
+        self.replay_time = 0.0
+        
         # Camera parameters
         self.camera_distance = 43.0  # Large enough to see all planets
         self.camera_rotation_x = 30.0
@@ -42,14 +66,73 @@ class GLWidget(QOpenGLWidget):
         self.last_mouse_pos = None
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         
-        self.stars = [
-            (random.uniform(-60, 60), random.uniform(-60, 60), random.uniform(-60, 60))
-            for _ in range(300)
-        ]
+        # Background stars; seed makes the sky reproducible
+        self.star_count = 2000
+        self.star_seed = None
+        self.starfield = None
         
         self.show_orbits = True
+        self.mesh_cache = None
+        self.sphere_renderer = None
+        self.instance_data = None
+        self.orbit_cache = None
+        
+        # Level of detail, chosen from each object's projected size
+        self.lod = LODSettings()
+        self.fov_y = 45.0
+        self.viewport_height = 600
+        self.eye = np.zeros(3)
+        self.pixel_scale = pixel_scale(self.fov_y, self.viewport_height)
+        self.frame_positions = None
+        self.frame_rotation = None
+        self.frame_levels = None
+        
+        # Click-to-select: camera matrices of the last frame and a grid
+        # over body positions, rebuilt only when bodies have moved too far
+        self.picker = BodyPicker()
+        self.view_matrix = None
+        self.projection_matrix = None
+        self.press_pos = None
+        
+        # Frustum culling: which bodies and rings are in view this frame
+        self.frustum = None
+        self.visible = None
+        self.visible_rings = set()
+        self.cull_stats = CullStats()
+        
+        # Model matrices of every body drawn with its own matrix, refilled
+        # in place each frame
+        self.transforms = ModelMatrices()
+        self.transform_key = None
+        # Rows without a CelestialBody, which the fixed path draws as points
+        self.point_rows = None
+        self.cull_summary = None
+        
+        # Frame timings, draw calls and vertex counts; the overlay shows
+        # them on top of the viewport and is refreshed a few times a second
+        self.profiler = FrameProfiler()
+        self.solar_system.profiler = self.profiler
+        self.overlay = QLabel(self)
+        self.overlay.setObjectName("profilerOverlay")
+        self.overlay.move(8, 8)
+        self.overlay.hide()
+        self.overlay_updated = 0.0
         
     def initializeGL(self):
+        # Sphere meshes are uploaded once and reused every frame
+        self.mesh_cache = MeshCache()
+        self.orbit_cache = OrbitCache([segments for _, segments in self.lod.orbit_levels])
+        self.starfield = Starfield(self.star_count, seed=self.star_seed)
+        # No context of its own when driven offscreen (src/benchmark.py)
+        if self.context() is not None:
+            self.context().aboutToBeDestroyed.connect(self.cleanup_gl)
+        # Draw all spheres in one instanced call when GL 3.3 shaders are
+        # available, otherwise keep the fixed-function path
+        try:
+            self.sphere_renderer = InstancedSphereRenderer()
+        except Exception as e:
+            print("Instanced rendering unavailable, using fixed-function path:", e)
+            self.sphere_renderer = None
         glClearColor(0.0, 0.0, 0.0, 1.0)
         glEnable(GL_DEPTH_TEST)
         glEnable(GL_LIGHTING)
@@ -60,45 +143,49 @@ class GLWidget(QOpenGLWidget):
         
         # Select Sun by default
         if self.selected_body is None:
-            self.selected_body = self.solar_system.get_bodies()[0]
+            self.selected_body = self.solar_system.registry.primary
         
     def update_lighting(self):
         # Place light at the sun's position
-        sun = self.solar_system.get_bodies()[0]
-        sun_pos = sun.get_position()
+        sun = self.solar_system.registry.primary
+        # This frame's position when there is one, without a copy
+        if self.frame_positions is not None:
+            sun_pos = self.frame_positions[sun.index]
+        else:
+            sun_pos = sun.get_position()
         glLightfv(GL_LIGHT0, GL_POSITION, (sun_pos[0], sun_pos[1], sun_pos[2], 1.0))
         glLightfv(GL_LIGHT0, GL_AMBIENT, (self.ambient_light, self.ambient_light, self.ambient_light, 1))
         glLightfv(GL_LIGHT0, GL_DIFFUSE, (self.diffuse_light, self.diffuse_light, self.diffuse_light, 1))
         
     def resizeGL(self, width, height):
         glViewport(0, 0, width, height)
+        self.viewport_height = max(height, 1)
+        self.pixel_scale = pixel_scale(self.fov_y, self.viewport_height)
         glMatrixMode(GL_PROJECTION)
         glLoadIdentity()
-        gluPerspective(45, width/height, 0.1, 100.0)
+        gluPerspective(self.fov_y, width/height, 0.1, 100.0)
         glMatrixMode(GL_MODELVIEW)
         
+    def cleanup_gl(self):
+        self.makeCurrent()
+        if self.mesh_cache is not None:
+            self.mesh_cache.release()
+        if self.sphere_renderer is not None:
+            self.sphere_renderer.release()
+        if self.orbit_cache is not None:
+            self.orbit_cache.release()
+        if self.starfield is not None:
+            self.starfield.release()
+        self.doneCurrent()
+
     def draw_sphere(self, radius, slices=32, stacks=32):
-        for i in range(stacks):
-            lat0 = math.pi * (-0.5 + float(i) / stacks)
-            z0 = math.sin(lat0)
-            zr0 = math.cos(lat0)
-            
-            lat1 = math.pi * (-0.5 + float(i + 1) / stacks)
-            z1 = math.sin(lat1)
-            zr1 = math.cos(lat1)
-            
-            glBegin(GL_QUAD_STRIP)
-            for j in range(slices + 1):
-                lng = 2 * math.pi * float(j) / slices
-                x = math.cos(lng)
-                y = math.sin(lng)
-                
-                glNormal3f(x * zr0, y * zr0, z0)
-                glVertex3f(x * zr0 * radius, y * zr0 * radius, z0 * radius)
-                
-                glNormal3f(x * zr1, y * zr1, z1)
-                glVertex3f(x * zr1 * radius, y * zr1 * radius, z1 * radius)
-            glEnd()
+        # Draw the cached unit sphere scaled to the body's radius
+        glPushMatrix()
+        glScalef(radius, radius, radius)
+        mesh = self.mesh_cache.sphere(slices, stacks)
+        mesh.draw()
+        self.profiler.draw(mesh.index_count)
+        glPopMatrix()
         
     def draw_selection_ring(self, radius, color):
         glColor3f(*color)  # Use planet's own color
@@ -110,9 +197,10 @@ class GLWidget(QOpenGLWidget):
             y = math.sin(angle) * (radius * 1.15)
             glVertex3f(x, y, 0)
         glEnd()
+        self.profiler.draw(64)
         glLineWidth(1.0)
 
-    def draw_saturn_rings(self, radius):
+    def draw_saturn_rings(self, radius, segments=64):
         glPushAttrib(GL_ENABLE_BIT)
         glDisable(GL_LIGHTING)
         glEnable(GL_BLEND)
@@ -121,8 +209,8 @@ class GLWidget(QOpenGLWidget):
         inner = radius * 1.3
         outer = radius * 2.2
         glBegin(GL_TRIANGLE_STRIP)
-        for i in range(65):
-            angle = 2 * math.pi * i / 64
+        for i in range(segments + 1):
+            angle = 2 * math.pi * i / segments
             x_in = math.cos(angle) * inner
             y_in = math.sin(angle) * inner
             x_out = math.cos(angle) * outer
@@ -130,169 +218,377 @@ class GLWidget(QOpenGLWidget):
             glVertex3f(x_in, y_in, 0)
             glVertex3f(x_out, y_out, 0)
         glEnd()
+        self.profiler.draw(2 * (segments + 1))
         glDisable(GL_BLEND)
         glEnable(GL_LIGHTING)
         glPopAttrib()
 
-    def draw_orbit(self, body):
+    def draw_orbits(self):
+        # All orbit loops from the cached buffer in one draw call
+        self.orbit_cache.update(self.solar_system.state,
+                                [segments for _, segments in self.lod.orbit_levels])
+        levels = self.orbit_cache.levels_for(self.lod, self.eye, self.pixel_scale)
+        centre, radius = self.orbit_cache.bounds()
+        visible = spheres_visible(self.frustum, centre, radius)
+        self.cull_stats.record('orbits', visible)
         glDisable(GL_LIGHTING)
         glColor4f(0.7, 0.7, 0.7, 0.5)
         glLineWidth(1.0)
-        glBegin(GL_LINE_LOOP)
-        for i in range(128):
-            angle = 2 * math.pi * i / 128
-            x = body.distance * math.cos(angle)
-            y = body.distance * math.sin(angle) * math.cos(body.orbital_inclination)
-            z = body.distance * math.sin(angle) * math.sin(body.orbital_inclination)
-            z += getattr(body, 'z_offset', 0.0)
-            glVertex3f(x, y, z)
-        glEnd()
+        self.orbit_cache.draw(levels, visible)
+        if visible.any():
+            self.profiler.draw(self.orbit_cache.segment_levels[levels[visible]].sum())
         glEnable(GL_LIGHTING)
 
+    def update_frame_state(self):
+        # World positions for this frame, interpolated between fixed steps
+        state = self.solar_system.state
+        if self.replay is not None and len(self.replay.names) == len(state):
+            self.frame_positions, self.frame_rotation = self.replay.sample(
+                self.replay_time, self.frame_positions)
+            return
+        if self.sim_worker is not None:
+            self.frame_positions, self.frame_rotation = self.sim_worker.latest(self.frame_positions)
+            if len(self.frame_positions) == len(state):
+                return
+            # A snapshot from before bodies were added or removed
+            self.frame_positions = state.world_positions()
+            self.frame_rotation = state.rotation_angle
+            return
+        if len(self.stepper.current) != len(self.solar_system.state):
+            self.stepper.reset()
+        self.frame_positions = self.stepper.positions(self.frame_positions)
+        self.frame_rotation = self.solar_system.state.rotation_angle
+
     def paintGL(self):
+        with self.profiler.stage('paint'):
+            self.render_frame()
+        self.profiler.end_frame()
+        if self.overlay.isVisible():
+            self.update_overlay()
+            
+    def render_frame(self):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glLoadIdentity()
+        with self.profiler.stage('interpolate'):
+            self.update_frame_state()
         
-        # Camera logic based on view mode
-        if self.view_mode == 'Free Camera':
-            glTranslatef(0.0, 0.0, -self.camera_distance)
-            glRotatef(self.camera_rotation_x, 1.0, 0.0, 0.0)
-            glRotatef(self.camera_rotation_y, 0.0, 1.0, 0.0)
-            glRotatef(self.camera_rotation_z, 0.0, 0.0, 1.0)
-        elif self.view_mode == 'Top View':
-            gluLookAt(0, 0, self.camera_distance, 0, 0, 0, 0, 1, 0)
-        elif self.view_mode == 'Lateral View':
-            gluLookAt(self.camera_distance, 0, 0, 0, 0, 0, 0, 0, 1)
-        elif self.view_mode == 'Oblic View':
-            d = self.camera_distance / math.sqrt(3)
-            gluLookAt(d, d, d, 0, 0, 0, 0, 0, 1)
-        elif self.view_mode == 'Follow Planet' and self.selected_body is not None:
-            pos = self.selected_body.get_position()
-            # Special case: if Moon, add Earth's position
-            if self.selected_body.name.lower() == 'moon':
-                earth = None
-                for body in self.solar_system.get_bodies():
-                    if body.name.lower() == 'earth':
-                        earth = body
-                        break
-                if earth is not None:
-                    pos = earth.get_position() + pos
-            if self.selected_body.name.lower() == 'sun':
-                cam_pos = pos + np.array([0.0, 0.0, self.follow_distance])
-                up = np.array([0, 1, 0])
-            else:
-                offset = np.array([1.0, 1.0, 1.0])
-                offset = offset / np.linalg.norm(offset) * self.follow_distance
-                cam_pos = pos + offset
-                up = np.array([0, 0, 1])
-            gluLookAt(cam_pos[0], cam_pos[1], cam_pos[2],
-                      pos[0], pos[1], pos[2],
-                      up[0], up[1], up[2])
+        with self.profiler.stage('camera'):
+            # Camera logic based on view mode
+            if self.view_mode == 'Free Camera':
+                glTranslatef(0.0, 0.0, -self.camera_distance)
+                glRotatef(self.camera_rotation_x, 1.0, 0.0, 0.0)
+                glRotatef(self.camera_rotation_y, 0.0, 1.0, 0.0)
+                glRotatef(self.camera_rotation_z, 0.0, 0.0, 1.0)
+            elif self.view_mode == 'Top View':
+                gluLookAt(0, 0, self.camera_distance, 0, 0, 0, 0, 1, 0)
+            elif self.view_mode == 'Lateral View':
+                gluLookAt(self.camera_distance, 0, 0, 0, 0, 0, 0, 0, 1)
+            elif self.view_mode == 'Oblic View':
+                d = self.camera_distance / math.sqrt(3)
+                gluLookAt(d, d, d, 0, 0, 0, 0, 0, 1)
+            elif self.view_mode == 'Follow Planet' and self.selected_body is not None:
+                # World position, so satellites are followed correctly too
+                pos = self.frame_positions[self.selected_body.index]
+                if self.solar_system.registry.is_type(self.selected_body.index, 'star'):
+                    cam_pos = pos + np.array([0.0, 0.0, self.follow_distance])
+                    up = np.array([0, 1, 0])
+                else:
+                    offset = np.array([1.0, 1.0, 1.0])
+                    offset = offset / np.linalg.norm(offset) * self.follow_distance
+                    cam_pos = pos + offset
+                    up = np.array([0, 0, 1])
+                gluLookAt(cam_pos[0], cam_pos[1], cam_pos[2],
+                          pos[0], pos[1], pos[2],
+                          up[0], up[1], up[2])
+            
+            self.view_matrix = glGetFloatv(GL_MODELVIEW_MATRIX)
+            self.projection_matrix = glGetFloatv(GL_PROJECTION_MATRIX)
+            self.eye = camera_eye(self.view_matrix)
+        
+        # Per-frame sphere detail levels and visibility
+        with self.profiler.stage('culling'):
+            state = self.solar_system.state
+            pixels = projected_radius(self.frame_positions, state.radius, self.eye, self.pixel_scale)
+            self.frame_levels = self.lod.sphere_level(pixels)
+            self.update_culling()
+        
+        with self.profiler.stage('transforms'):
+            self.update_transforms()
         
         # Draw starry background
-        glDisable(GL_LIGHTING)
-        glPointSize(1.5)
-        glBegin(GL_POINTS)
-        glColor3f(1.0, 1.0, 1.0)
-        for x, y, z in self.stars:
-            glVertex3f(x, y, z)
-        glEnd()
-        glEnable(GL_LIGHTING)
+        with self.profiler.stage('starfield'):
+            self.starfield.draw()
+        calls = 1 if self.starfield.program is not None else len(self.starfield.buckets)
+        self.profiler.draw(self.starfield.count, calls)
         self.update_lighting()
         
         # Draw all orbital trajectories if enabled (read directly from MainWindow)
         mainwindow = self.parent().parent()
         if hasattr(mainwindow, 'orbit_checkbox') and mainwindow.orbit_checkbox.isChecked():
-            for body in self.solar_system.get_bodies():
-                self.draw_orbit(body)
+            with self.profiler.stage('orbits'):
+                self.draw_orbits()
         
         # Draw all celestial bodies
-        for body in self.solar_system.get_bodies():
-            glPushMatrix()
-            pos = body.get_position()
-            glTranslatef(pos[0], pos[1], pos[2])
+        with self.profiler.stage('bodies'):
+            if self.sphere_renderer is not None:
+                self.draw_bodies_instanced()
+            else:
+                self.draw_bodies_fixed()
+        
+        # Report culled counts when they change
+        summary = self.cull_stats.summary()
+        if summary != self.cull_summary and hasattr(mainwindow, 'show_cull_stats'):
+            self.cull_summary = summary
+            mainwindow.show_cull_stats(summary)
+            
+    def update_overlay(self):
+        now = time.perf_counter()
+        if now - self.overlay_updated < 0.25:
+            return
+        self.overlay_updated = now
+        self.overlay.setText(self.profiler.summary())
+        self.overlay.adjustSize()
+        
+    def set_profiler_overlay(self, visible):
+        self.overlay.setVisible(visible)
+        if visible:
+            self.overlay_updated = 0.0
+            self.update_overlay()
+            
+    def update_transforms(self):
+        # Bodies with an object (the fixed path draws each one as a mesh)
+        # come first, in get_bodies order, then ringed rows without one
+        bodies = self.solar_system.get_bodies()
+        ringed = self.solar_system.registry.ringed_ids()
+        key = (len(bodies), len(ringed), len(self.solar_system.state))
+        if key != self.transform_key:
+            self.transform_key = key
+            rows = [body.index for body in bodies]
+            self.point_rows = np.ones(len(self.solar_system.state), dtype=bool)
+            self.point_rows[rows] = False
+            known = set(rows)
+            rows += [index for index in ringed.tolist() if index not in known]
+            self.transforms.set_rows(rows)
+        self.transforms.update(self.frame_positions, self.frame_rotation)
             
-            # Apply body's own rotation
-            rot_matrix = body.get_rotation_matrix()
-            glMultMatrixf(rot_matrix.flatten())
+    def update_culling(self):
+        # Bounding spheres against the view frustum, all bodies in one batch.
+        # Bodies are tested with their selection ring's radius, ringed
+        # bodies separately with the outer ring radius.
+        self.frustum = frustum_planes(self.view_matrix, self.projection_matrix)
+        self.cull_stats.reset()
+        positions = self.frame_positions
+        state = self.solar_system.state
+        self.visible = spheres_visible(self.frustum, positions, 1.15 * state.radius)
+        self.cull_stats.record('bodies', self.visible)
+        ringed = self.solar_system.registry.ringed_ids()
+        shown = spheres_visible(self.frustum, positions[ringed], 2.2 * state.radius[ringed])
+        self.visible_rings = set(ringed[shown].tolist())
+        self.cull_stats.record('rings', shown)
+            
+    def draw_bodies_fixed(self):
+        # Every body at its world position, whatever its depth in the hierarchy
+        matrices = self.transforms.matrices
+        for slot, body in enumerate(self.solar_system.get_bodies()):
+            # Skip bodies whose sphere, selection ring and rings are all
+            # outside the view
+            in_view = self.visible[body.index]
+            has_rings = body.index in self.visible_rings
+            if not (in_view or has_rings):
+                continue
+            glPushMatrix()
+            # Body position and its own rotation, from this frame's buffer
+            glMultMatrixf(matrices[slot])
             
             color = body.get_color()
             glColor3f(color[0], color[1], color[2])
             
             # Draw selection ring if selected
-            if body == self.selected_body:
+            if in_view and body == self.selected_body:
                 glDisable(GL_LIGHTING)
                 self.draw_selection_ring(body.radius, color)
                 glEnable(GL_LIGHTING)
             
-            self.draw_sphere(body.radius)
-            # Draw Saturn's rings if this is Saturn
-            if body.name.lower() == 'saturn':
-                self.draw_saturn_rings(body.radius)
-            # Draw satellites (e.g., Moon for Earth)
-            for moon in self.solar_system.get_satellites(body.name):
-                glPushMatrix()
-                moon_pos = moon.get_position()
-                glTranslatef(moon_pos[0], moon_pos[1], moon_pos[2])
-                moon_color = moon.get_color()
-                glColor3f(moon_color[0], moon_color[1], moon_color[2])
-                self.draw_sphere(moon.radius)
-                if moon == self.selected_body:
-                    glDisable(GL_LIGHTING)
-                    self.draw_selection_ring(moon.radius, moon_color)
-                    glEnable(GL_LIGHTING)
-                glPopMatrix()
+            if in_view:
+                self.draw_lod_sphere(body)
+            # Draw rings (Saturn) from the registry's flags
+            if has_rings:
+                self.draw_lod_rings(body)
+            glPopMatrix()
+        # Rows without a CelestialBody (bulk-loaded bodies) as points; the
+        # bodies above already have their meshes
+        state = self.solar_system.state
+        if len(state) > len(self.solar_system.get_bodies()):
+            visible = self.visible & self.point_rows
+            self.draw_points(self.frame_positions[visible], state.color[visible])
+
+    def draw_lod_sphere(self, body):
+        segments = self.lod.sphere_segments(self.frame_levels[body.index])
+        self.draw_sphere(body.radius, segments, segments)
+
+    def draw_lod_rings(self, body):
+        # Saturn's rings reach 2.2 body radii
+        pixels = 2.2 * body.radius * self.pixel_scale / max(
+            np.linalg.norm(self.eye - self.frame_positions[body.index]), 1e-6)
+        self.draw_saturn_rings(body.radius, self.lod.ring_segments(pixels))
+
+    def draw_points(self, positions, colors):
+        glDisable(GL_LIGHTING)
+        glPointSize(2.0)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_DOUBLE, 0, np.ascontiguousarray(positions))
+        glColorPointer(3, GL_FLOAT, 0, np.ascontiguousarray(colors))
+        glDrawArrays(GL_POINTS, 0, len(positions))
+        self.profiler.draw(len(positions))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glPointSize(1.0)
+        glEnable(GL_LIGHTING)
+
+    def draw_bodies_instanced(self):
+        state = self.solar_system.state
+        positions = self.frame_positions
+        # Only bodies in view, grouped by detail level so each level is one
+        # draw call
+        visible = np.flatnonzero(self.visible)
+        levels = self.frame_levels[visible]
+        order = visible[np.argsort(levels, kind='stable')]
+        counts = np.bincount(levels, minlength=self.lod.point_level + 1)
+        self.instance_data = build_instances(positions[order], state.radius[order], state.color[order],
+                                             self.frame_rotation[order], out=self.instance_data)
+        self.sphere_renderer.upload(self.instance_data)
+        # The camera was set up with fixed-function calls; reuse its matrices
+        view = glGetFloatv(GL_MODELVIEW_MATRIX)
+        projection = glGetFloatv(GL_PROJECTION_MATRIX)
+        sun = self.solar_system.registry.primary
+        self.sphere_renderer.begin(view, projection, positions[sun.index],
+                                   self.ambient_light, self.diffuse_light)
+        first = 0
+        for level in range(self.lod.point_level):
+            segments = self.lod.sphere_segments(level)
+            mesh = self.mesh_cache.sphere(segments, segments)
+            self.sphere_renderer.draw(mesh, first, counts[level])
+            if counts[level]:
+                self.profiler.draw(mesh.index_count * counts[level])
+            first += counts[level]
+        self.sphere_renderer.end()
+        # Bodies below the smallest sphere threshold collapse to points
+        far = order[first:]
+        if len(far):
+            self.draw_points(positions[far], state.color[far])
+        self.draw_body_decorations(positions)
+
+    def draw_body_decorations(self, positions):
+        # Selection ring and Saturn's rings are still drawn per body
+        body = self.selected_body
+        if body is not None and self.visible[body.index]:
+            glPushMatrix()
+            glTranslatef(*positions[body.index])
+            glDisable(GL_LIGHTING)
+            self.draw_selection_ring(body.radius, body.get_color())
+            glEnable(GL_LIGHTING)
+            glPopMatrix()
+        registry = self.solar_system.registry
+        for index in self.visible_rings:
+            body = registry.body(index)
+            glPushMatrix()
+            glMultMatrixf(self.transforms.matrix(index))
+            self.draw_lod_rings(body)
             glPopMatrix()
             
     def animate(self):
+        with self.profiler.stage('animate'):
+            self.advance_frame()
+            
+    def advance_frame(self):
+        # Advance by real elapsed time, in fixed steps, so timer jitter and
+        # slow frames do not change how fast simulated time passes
+        now = time.perf_counter()
+        elapsed = now - self.last_frame_time
+        self.last_frame_time = now
         if self.is_running:
-            self.solar_system.update(0.016 * self.simulation_speed)
+            if self.replay is not None:
+                # Play the replay forward at the simulation's own pace
+                self.replay_time = min(self.replay_time + elapsed * self.simulation_speed * self.solar_system.slow_factor,
+                                       self.replay.end)
+                self.parent().parent().sync_timeline()
+            elif self.sim_worker is None:
+                self.stepper.advance(elapsed * self.simulation_speed)
             self.update()
             
     def select_body(self, body_name):
-        # Search in planets
-        found = False
-        for body in self.solar_system.get_bodies():
-            if body.name == body_name:
-                self.selected_body = body
-                color = body.get_color()
-                info = f"Name: {body.name}\n"
-                info += f"Radius: {body.radius:.2f}\n"
-                info += f"Distance: {body.distance:.2f}\n"
-                info += f"Orbital Period: {body.orbital_period:.2f} years\n"
-                info += f"Rotation Period: {body.rotation_period:.2f} days\n"
-                info += f"Orbital Inclination: {math.degrees(body.orbital_inclination):.2f}°"
-                self.selected_body = body
-                self.info_label.setText(info)
-                found = True
-                break
-        # Search in satellites if not found
-        if not found:
-            for planet in self.solar_system.get_bodies():
-                for sat in self.solar_system.get_satellites(planet.name):
-                    if sat.name == body_name:
-                        self.selected_body = sat
-                        color = sat.get_color()
-                        info = f"Name: {sat.name}\n"
-                        info += f"Radius: {sat.radius:.2f}\n"
-                        info += f"Distance: {sat.distance:.2f} (from planet)\n"
-                        info += f"Orbital Period: {sat.orbital_period:.2f} years\n"
-                        info += f"Rotation Period: {sat.rotation_period:.2f} days\n"
-                        info += f"Orbital Inclination: {math.degrees(sat.orbital_inclination):.2f}°"
-                        self.selected_body = sat
-                        self.info_label.setText(info)
-                        found = True
-                        break
-                if found:
-                    break
-        self.update()
+        # Go through the browser so the list and info panel stay in sync
+        self.parent().parent().select_body(body_name)
         
     def set_simulation_speed(self, speed):
         self.simulation_speed = speed
+        if self.sim_worker is not None:
+            self.sim_worker.speed = speed
         
     def toggle_simulation(self, running):
         self.is_running = running
+        if self.sim_worker is not None:
+            self.sim_worker.running = running and self.replay is None
+
+    def set_threaded_simulation(self, enabled):
+        # Step the simulation on a worker thread that publishes snapshots
+        if enabled and self.sim_worker is None:
+            self.sim_worker = SimulationWorker(self.solar_system, self.stepper.step, self.simulation_speed)
+            self.sim_worker.running = self.is_running and self.replay is None
+            self.sim_worker.start()
+        elif not enabled and self.sim_worker is not None:
+            self.sim_worker.stop()
+            self.sim_worker = None
+            self.stepper.reset()
         
+    @contextlib.contextmanager
+    def editing_bodies(self):
+        # Wrap changes that add or remove rows: replay mode ends, since its
+        # keyframes describe the old bodies, the worker thread does not step
+        # meanwhile, and interpolation restarts from the new state
+        if self.replay is not None:
+            self.parent().parent().replay_checkbox.setChecked(False)
+        try:
+            if self.sim_worker is not None:
+                with self.sim_worker.paused():
+                    yield
+            else:
+                yield
+        finally:
+            self.stepper.reset()
+            self.update()
+        
+    def set_keyframe_capture(self, enabled):
+        if enabled:
+            self.solar_system.add_observer(self.keyframes)
+        else:
+            self.solar_system.remove_observer(self.keyframes)
+            self.keyframes.clear()
+
+    def set_replay(self, enabled, source=None):
+        # Replay keyframes (captured, or a loaded recording) instead of
+        # stepping; the live simulation is paused and resumes unchanged
+        if enabled:
+            replay = Replay(source if source is not None else self.keyframes)
+            if len(replay) == 0 or len(replay.names) != len(self.solar_system.state):
+                print("Replay needs keyframes of all", len(self.solar_system.state), "bodies")
+                return False
+            self.replay = replay
+            self.replay_time = replay.end
+        else:
+            self.replay = None
+            self.stepper.reset()
+        if self.sim_worker is not None:
+            self.sim_worker.running = self.is_running and self.replay is None
+        self.last_frame_time = time.perf_counter()
+        self.update()
+        return True
+
+    def seek(self, replay_time):
+        self.replay_time = replay_time
+        self.update()
+
     def set_camera_distance(self, distance):
         self.camera_distance = distance
         self.update()
@@ -317,9 +613,26 @@ class GLWidget(QOpenGLWidget):
         self.follow_distance = distance
         self.update()
 
+    def set_starfield(self, count, seed=None):
+        # Regenerate the background, e.g. a denser sky
+        self.star_count = count
+        self.star_seed = seed
+        if self.starfield is None:
+            return  # Built in initializeGL
+        self.makeCurrent()
+        self.starfield.release()
+        self.starfield = Starfield(count, seed=seed)
+        self.doneCurrent()
+        self.update()
+
+    def set_lod_bias(self, bias):
+        self.lod.bias = bias
+        self.update()
+
     def mousePressEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton:
             self.last_mouse_pos = event.position()
+            self.press_pos = event.position()
     def mouseMoveEvent(self, event: QMouseEvent):
         if self.last_mouse_pos is not None and self.parent().parent().view_combo.currentText() == 'Free Camera':
             delta = event.position() - self.last_mouse_pos
@@ -336,6 +649,32 @@ class GLWidget(QOpenGLWidget):
     def mouseReleaseEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton:
             self.last_mouse_pos = None
+            # A click rather than a drag selects the body under the cursor
+            if self.press_pos is not None:
+                delta = event.position() - self.press_pos
+                if abs(delta.x()) + abs(delta.y()) <= 3:
+                    self.pick_body(event.position().x(), event.position().y())
+            self.press_pos = None
+    def pick_body(self, x, y):
+        positions = self.frame_positions
+        state = self.solar_system.state
+        if self.view_matrix is None or positions is None or len(positions) != len(state):
+            return
+        # Mouse coordinates are logical pixels, while the viewport and
+        # pixel_scale are in device pixels; work in device pixels throughout
+        ratio = self.devicePixelRatioF()
+        origin, direction = ray_from_screen(x * ratio, y * ratio, self.width() * ratio,
+                                            self.height() * ratio,
+                                            self.view_matrix, self.projection_matrix)
+        now = self.replay_time if self.replay is not None else self.solar_system.time
+        if self.picker.is_stale(len(positions), now):
+            speeds = np.linalg.norm(self.solar_system.get_velocities(), axis=1)
+            self.picker.build(positions, state.radius, now, speeds.max(initial=0.0))
+        # Accept clicks within a few (logical) pixels of small or distant bodies
+        body_id = self.picker.pick(origin, direction, positions, state.radius, now,
+                                   self.picker.max_speed, tolerance=4.0 * ratio / self.pixel_scale)
+        if body_id >= 0:
+            self.parent().parent().body_browser.select(body_id)
     def wheelEvent(self, event: QWheelEvent):
         if self.parent().parent().view_combo.currentText() in ['Free Camera', 'Top View']:
             delta = event.angleDelta().y() / 120  # 1 step per notch
@@ -354,6 +693,10 @@ class GLWidget(QOpenGLWidget):
             self.update()
     def keyPressEvent(self, event: QKeyEvent):
         key = event.key()
+        if key == Qt.Key.Key_F3:
+            checkbox = self.parent().parent().profiler_checkbox
+            checkbox.setChecked(not checkbox.isChecked())
+            return
         step = 5
         zstep = 5
         zoomstep = 1
@@ -404,7 +747,7 @@ class GLWidget(QOpenGLWidget):
         self.update()
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, seed=None):
         super().__init__()
         self.setWindowTitle("Solar System Simulation")
         self.setMinimumSize(1000, 800)
@@ -415,7 +758,7 @@ class MainWindow(QMainWindow):
         layout = QHBoxLayout(central_widget)
         
         # Create OpenGL widget
-        self.gl_widget = GLWidget()
+        self.gl_widget = GLWidget(seed=seed)
         layout.addWidget(self.gl_widget, stretch=2)
         
         # Create control panel
@@ -439,9 +782,42 @@ class MainWindow(QMainWindow):
         self.speed_slider.valueChanged.connect(self.change_speed)
         speed_layout.addWidget(self.speed_slider)
         sim_layout.addLayout(speed_layout)
+        self.thread_checkbox = QCheckBox("Background Thread")
+        self.thread_checkbox.stateChanged.connect(self.toggle_threaded_simulation)
+        sim_layout.addWidget(self.thread_checkbox)
         sim_group.setLayout(sim_layout)
         control_layout.addWidget(sim_group)
         
+        # Replay Controls
+        replay_group = QGroupBox("Replay")
+        replay_layout = QVBoxLayout()
+        self.replay_checkbox = QCheckBox("Replay Mode")
+        self.replay_checkbox.stateChanged.connect(self.toggle_replay)
+        replay_layout.addWidget(self.replay_checkbox)
+        self.capture_checkbox = QCheckBox("Capture Keyframes")
+        self.capture_checkbox.stateChanged.connect(self.toggle_keyframe_capture)
+        replay_layout.addWidget(self.capture_checkbox)
+        timeline_layout = QHBoxLayout()
+        self.timeline_slider = QSlider(Qt.Orientation.Horizontal)
+        self.timeline_slider.setMinimum(0)
+        self.timeline_slider.setMaximum(1000)
+        self.timeline_slider.setEnabled(False)
+        self.timeline_slider.valueChanged.connect(self.seek_timeline)
+        timeline_layout.addWidget(self.timeline_slider)
+        self.timeline_label = QLabel("0.00 y")
+        timeline_layout.addWidget(self.timeline_label)
+        replay_layout.addLayout(timeline_layout)
+        file_layout = QHBoxLayout()
+        load_button = QPushButton("Load...")
+        load_button.clicked.connect(self.load_recording)
+        file_layout.addWidget(load_button)
+        save_button = QPushButton("Save...")
+        save_button.clicked.connect(self.save_keyframes)
+        file_layout.addWidget(save_button)
+        replay_layout.addLayout(file_layout)
+        replay_group.setLayout(replay_layout)
+        control_layout.addWidget(replay_group)
+        
         # View Mode Controls
         view_group = QGroupBox("View Mode")
         view_layout = QVBoxLayout()
@@ -488,27 +864,45 @@ class MainWindow(QMainWindow):
         light_layout.addLayout(diffuse_layout)
         light_group.setLayout(light_layout)
         control_layout.addWidget(light_group)
+        # Rendering Controls
+        render_group = QGroupBox("Rendering")
+        render_outer = QVBoxLayout()
+        render_layout = QHBoxLayout()
+        render_layout.addWidget(QLabel("Detail:"))
+        self.lod_slider = QSlider(Qt.Orientation.Horizontal)
+        self.lod_slider.setMinimum(25)
+        self.lod_slider.setMaximum(400)
+        self.lod_slider.setValue(100)
+        self.lod_slider.valueChanged.connect(self.change_lod_bias)
+        render_layout.addWidget(self.lod_slider)
+        render_outer.addLayout(render_layout)
+        # Objects skipped by frustum culling in the last frame
+        self.cull_label = QLabel("Culled: -")
+        render_outer.addWidget(self.cull_label)
+        # Frame timings over the viewport (F3), exportable for comparisons
+        profile_layout = QHBoxLayout()
+        self.profiler_checkbox = QCheckBox("Profiler Overlay")
+        self.profiler_checkbox.stateChanged.connect(self.toggle_profiler_overlay)
+        profile_layout.addWidget(self.profiler_checkbox)
+        export_button = QPushButton("Export Profile...")
+        export_button.clicked.connect(self.export_profile)
+        profile_layout.addWidget(export_button)
+        render_outer.addLayout(profile_layout)
+        render_group.setLayout(render_outer)
+        control_layout.addWidget(render_group)
         # Body Selection
         body_group = QGroupBox("Celestial Body Info")
         body_layout = QVBoxLayout()
-        # Add all main bodies and satellites to the dropdown (Moon after Earth)
-        all_bodies = [body.name for body in self.gl_widget.solar_system.get_bodies()]
-        moon_inserted = False
-        result_bodies = []
-        for name in all_bodies:
-            result_bodies.append(name)
-            if name == 'Earth':
-                # Insert Moon right after Earth
-                for sat in self.gl_widget.solar_system.get_satellites('Earth'):
-                    if sat.name not in result_bodies:
-                        result_bodies.append(sat.name)
-        self.body_combo = QComboBox()
-        self.body_combo.addItems(result_bodies)
-        self.body_combo.currentTextChanged.connect(self.select_body)
-        body_layout.addWidget(self.body_combo)
-        self.info_label = QLabel("Select a body to view its information")
-        self.info_label.setWordWrap(True)
-        body_layout.addWidget(self.info_label)
+        # Searchable list of every body, each followed by its satellites;
+        # rows are created lazily so large catalogs open instantly
+        self.body_browser = BodyBrowser(self.gl_widget.solar_system)
+        self.body_browser.bodySelected.connect(self.select_body_id)
+        body_layout.addWidget(self.body_browser)
+        self.info_panel = BodyInfoPanel(self.gl_widget.solar_system)
+        body_layout.addWidget(self.info_panel)
+        catalog_button = QPushButton("Load Catalog...")
+        catalog_button.clicked.connect(self.open_catalog)
+        body_layout.addWidget(catalog_button)
         body_group.setLayout(body_layout)
         control_layout.addWidget(body_group)
         # Create Show Orbits checkbox ONCE here
@@ -576,6 +970,73 @@ class MainWindow(QMainWindow):
         
     def change_speed(self, value):
         self.gl_widget.set_simulation_speed(value)
+
+    def toggle_threaded_simulation(self, state):
+        self.gl_widget.set_threaded_simulation(state == Qt.CheckState.Checked.value)
+
+    def toggle_keyframe_capture(self, state):
+        self.gl_widget.set_keyframe_capture(state == Qt.CheckState.Checked.value)
+
+    def toggle_replay(self, state):
+        enabled = state == Qt.CheckState.Checked.value
+        if not self.gl_widget.set_replay(enabled) and enabled:
+            self.replay_checkbox.setChecked(False)
+            return
+        self.timeline_slider.setEnabled(enabled)
+        self.sync_timeline()
+
+    def load_recording(self):
+        path = QFileDialog.getExistingDirectory(self, "Open Recording")
+        if not path:
+            return
+        if self.gl_widget.set_replay(True, path):
+            self.replay_checkbox.blockSignals(True)
+            self.replay_checkbox.setChecked(True)
+            self.replay_checkbox.blockSignals(False)
+            self.timeline_slider.setEnabled(True)
+            self.sync_timeline()
+
+    def open_catalog(self):
+        # Add every body of a CSV, JSON or binary catalog in one batch
+        path, _ = QFileDialog.getOpenFileName(self, "Load Catalog", "",
+                                              "Catalogs (*.csv *.json *.pscat)")
+        if not path:
+            return
+        try:
+            with self.gl_widget.editing_bodies():
+                load_catalog(self.gl_widget.solar_system, path)
+        except (OSError, ValueError, KeyError) as e:
+            print("Could not load catalog:", e)
+            return
+        self.body_browser.refresh()
+        self.gl_widget.update()
+
+    def save_keyframes(self):
+        path = QFileDialog.getExistingDirectory(self, "Save Keyframes To")
+        if path:
+            self.gl_widget.keyframes.save(path)
+
+    def seek_timeline(self, value):
+        replay = self.gl_widget.replay
+        if replay is None:
+            return
+        self.gl_widget.seek(replay.start + (replay.end - replay.start) * value / 1000.0)
+        self.timeline_label.setText(f"{self.gl_widget.replay_time:.2f} y")
+
+    def sync_timeline(self):
+        # Move the slider to the replay time without seeking again
+        replay = self.gl_widget.replay
+        if replay is None:
+            return
+        span = max(replay.end - replay.start, 1e-9)
+        self.timeline_slider.blockSignals(True)
+        self.timeline_slider.setValue(int(round(1000 * (self.gl_widget.replay_time - replay.start) / span)))
+        self.timeline_slider.blockSignals(False)
+        self.timeline_label.setText(f"{self.gl_widget.replay_time:.2f} y")
+
+    def closeEvent(self, event):
+        self.gl_widget.set_threaded_simulation(False)
+        super().closeEvent(event)
         
     def change_camera_distance(self, value):
         self.gl_widget.set_camera_distance(value)
@@ -591,40 +1052,29 @@ class MainWindow(QMainWindow):
         diffuse = self.diffuse_slider.value() / 100.0
         self.gl_widget.set_lighting(ambient, diffuse)
         
+    def change_lod_bias(self, value):
+        self.gl_widget.set_lod_bias(value / 100.0)
+
+    def toggle_profiler_overlay(self, state):
+        self.gl_widget.set_profiler_overlay(state == Qt.CheckState.Checked.value)
+
+    def export_profile(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Profile", "profile.csv",
+                                              "CSV (*.csv);;JSON (*.json)")
+        if path:
+            self.gl_widget.profiler.export(path)
+
+    def show_cull_stats(self, summary):
+        self.cull_label.setText(f"Culled: {summary}")
+
     def select_body(self, body_name):
-        # Search in planets
-        found = False
-        for body in self.gl_widget.solar_system.get_bodies():
-            if body.name == body_name:
-                self.gl_widget.selected_body = body
-                color = body.get_color()
-                info = f"Name: {body.name}\n"
-                info += f"Radius: {body.radius:.2f}\n"
-                info += f"Distance: {body.distance:.2f}\n"
-                info += f"Orbital Period: {body.orbital_period:.2f} years\n"
-                info += f"Rotation Period: {body.rotation_period:.2f} days\n"
-                info += f"Orbital Inclination: {math.degrees(body.orbital_inclination):.2f}°"
-                self.info_label.setText(info)
-                found = True
-                break
-        # Search in satellites if not found
-        if not found:
-            for planet in self.gl_widget.solar_system.get_bodies():
-                for sat in self.gl_widget.solar_system.get_satellites(planet.name):
-                    if sat.name == body_name:
-                        self.gl_widget.selected_body = sat
-                        color = sat.get_color()
-                        info = f"Name: {sat.name}\n"
-                        info += f"Radius: {sat.radius:.2f}\n"
-                        info += f"Distance: {sat.distance:.2f} (from planet)\n"
-                        info += f"Orbital Period: {sat.orbital_period:.2f} years\n"
-                        info += f"Rotation Period: {sat.rotation_period:.2f} days\n"
-                        info += f"Orbital Inclination: {math.degrees(sat.orbital_inclination):.2f}°"
-                        self.info_label.setText(info)
-                        found = True
-                        break
-                if found:
-                    break
+        body_id = self.gl_widget.solar_system.registry.id(body_name)
+        if body_id is not None:
+            self.body_browser.select(body_id)
+
+    def select_body_id(self, body_id):
+        self.gl_widget.selected_body = self.gl_widget.solar_system.get_body(body_id)
+        self.info_panel.show_body(body_id)
         self.gl_widget.update()
 
     def change_view_mode(self, mode):
@@ -653,8 +1103,9 @@ class MainWindow(QMainWindow):
             self.last_target = np.array([0.0, 0.0, 0.0])
             self.last_up = np.array([0.0, 0.0, 1.0])
         elif mode == 'Follow Planet' and self.gl_widget.selected_body is not None:
-            pos = self.gl_widget.selected_body.get_position()
-            if self.gl_widget.selected_body.name.lower() == 'sun':
+            # World position, so satellites are handled like planets
+            pos = self.gl_widget.solar_system.state.world_positions()[self.gl_widget.selected_body.index]
+            if self.gl_widget.solar_system.registry.is_type(self.gl_widget.selected_body.index, 'star'):
                 self.last_eye = pos + np.array([0.0, 0.0, self.gl_widget.follow_distance])
                 self.last_target = pos
                 self.last_up = np.array([0.0, 1.0, 0.0])